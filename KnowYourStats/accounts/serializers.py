@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError as DjangoValidationError
 
 User = get_user_model()
 
@@ -9,13 +10,12 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     """Serializer for user registration"""
     
     password = serializers.CharField(
-        write_only=True, 
-        required=True, 
-        validators=[validate_password],
+        write_only=True,
+        required=True,
         style={'input_type': 'password'}
     )
     password_confirm = serializers.CharField(
-        write_only=True, 
+        write_only=True,
         required=True,
         style={'input_type': 'password'}
     )
@@ -31,8 +31,15 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     def validate(self, attrs):
         """Validate passwords match"""
+        # Check the match first so mismatches skip the validator chain
         if attrs['password'] != attrs['password_confirm']:
             raise serializers.ValidationError({"password": "Password fields didn't match."})
+        # Re-key Django's errors under the field so clients keep
+        # rendering them next to the password input
+        try:
+            validate_password(attrs['password'])
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError({"password": exc.messages})
         return attrs
     
     def create(self, validated_data):
@@ -42,13 +49,33 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 
+class UserListSerializer(serializers.ListSerializer):
+    """
+    Serialize user collections from a single .values() query instead of
+    binding a full serializer instance per user
+    """
+
+    LIST_FIELDS = ['id', 'email', 'full_name', 'company_name', 'phone_number', 'created_at']
+
+    def to_representation(self, data):
+        if hasattr(data, 'values'):
+            created_at_field = serializers.DateTimeField()
+            rows = []
+            for row in data.values(*self.LIST_FIELDS):
+                row['created_at'] = created_at_field.to_representation(row['created_at'])
+                rows.append(row)
+            return rows
+        return super().to_representation(data)
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for user data"""
-    
+
     class Meta:
         model = User
         fields = ['id', 'email', 'full_name', 'company_name', 'phone_number', 'created_at']
         read_only_fields = ['id', 'created_at']
+        list_serializer_class = UserListSerializer
 
 
 class UserUpdateSerializer(serializers.ModelSerializer):
@@ -63,11 +90,16 @@ class ChangePasswordSerializer(serializers.Serializer):
     """Serializer for password change"""
     
     old_password = serializers.CharField(required=True, style={'input_type': 'password'})
-    new_password = serializers.CharField(required=True, validators=[validate_password], style={'input_type': 'password'})
+    new_password = serializers.CharField(required=True, style={'input_type': 'password'})
     new_password_confirm = serializers.CharField(required=True, style={'input_type': 'password'})
-    
+
     def validate(self, attrs):
         """Validate new passwords match"""
+        # Check the match first so mismatches skip the validator chain
         if attrs['new_password'] != attrs['new_password_confirm']:
             raise serializers.ValidationError({"new_password": "Password fields didn't match."})
+        try:
+            validate_password(attrs['new_password'])
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError({"new_password": exc.messages})
         return attrs
\ No newline at end of file
@@ -0,0 +1,39 @@
+import gzip
+
+from django.contrib.auth.password_validation import CommonPasswordValidator
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext as _
+
+
+class CachedCommonPasswordValidator(CommonPasswordValidator):
+    """
+    CommonPasswordValidator that loads the gzipped common-password list
+    once per process into a frozenset, so register/change-password
+    requests only pay a set lookup instead of re-reading the word list.
+    """
+
+    _passwords = None
+
+    def __init__(self, password_list_path=None):
+        # Skip the parent's eager per-instance load; the list is loaded
+        # lazily and shared across instances
+        if password_list_path is None:
+            password_list_path = self.DEFAULT_PASSWORD_LIST_PATH
+        self.password_list_path = password_list_path
+
+    def _load(self):
+        if CachedCommonPasswordValidator._passwords is None:
+            try:
+                with gzip.open(self.password_list_path, 'rt', encoding='utf-8') as f:
+                    CachedCommonPasswordValidator._passwords = frozenset(f.read().splitlines())
+            except OSError:
+                with open(self.password_list_path) as f:
+                    CachedCommonPasswordValidator._passwords = frozenset(f.read().splitlines())
+        return CachedCommonPasswordValidator._passwords
+
+    def validate(self, password, user=None):
+        if password.strip().lower() in self._load():
+            raise ValidationError(
+                _('This password is too common.'),
+                code='password_too_common',
+            )
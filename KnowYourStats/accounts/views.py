@@ -4,6 +4,8 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+import hashlib
+import time
 
 from .serializers import (
     UserRegistrationSerializer,
@@ -14,6 +16,43 @@ from .serializers import (
 
 User = get_user_model()
 
+# Short-lived cache of successful password checks so clients that
+# re-authenticate within the window skip the expensive hash
+_PASSWORD_CHECK_CACHE = {}
+_PASSWORD_CHECK_TTL = 60  # seconds
+_PASSWORD_CHECK_MAX_ENTRIES = 1024
+
+
+def _check_password_cached(user, password):
+    """check_password with a TTL cache of successes per (user, hash)"""
+    digest = hashlib.sha256(password.encode()).hexdigest()
+    # Keying on the stored hash invalidates entries on password change
+    key = (user.pk, user.password, digest)
+    now = time.monotonic()
+
+    cached_at = _PASSWORD_CHECK_CACHE.get(key)
+    if cached_at is not None and now - cached_at < _PASSWORD_CHECK_TTL:
+        return True
+
+    if not user.check_password(password):
+        return False
+
+    _PASSWORD_CHECK_CACHE[key] = now
+    if len(_PASSWORD_CHECK_CACHE) > _PASSWORD_CHECK_MAX_ENTRIES:
+        for stale_key in [k for k, t in _PASSWORD_CHECK_CACHE.items()
+                          if now - t >= _PASSWORD_CHECK_TTL]:
+            del _PASSWORD_CHECK_CACHE[stale_key]
+        # The stale sweep alone doesn't bound the dict - a burst of
+        # distinct fresh logins within one TTL would grow it without
+        # limit. Evict oldest entries down to the cap regardless of age
+        overflow = len(_PASSWORD_CHECK_CACHE) - _PASSWORD_CHECK_MAX_ENTRIES
+        if overflow > 0:
+            for old_key in sorted(
+                _PASSWORD_CHECK_CACHE, key=_PASSWORD_CHECK_CACHE.get
+            )[:overflow]:
+                del _PASSWORD_CHECK_CACHE[old_key]
+    return True
+
 
 class RegisterView(generics.CreateAPIView):
     """User registration endpoint"""
@@ -64,7 +103,7 @@ class LoginView(generics.GenericAPIView):
                 'message': 'Invalid credentials'
             }, status=status.HTTP_401_UNAUTHORIZED)
         
-        if not user.check_password(password):
+        if not _check_password_cached(user, password):
             return Response({
                 'success': False,
                 'message': 'Invalid credentials'
@@ -1,8 +1,31 @@
-import json
+import asyncio
+import inspect
+import re
 import anthropic
-from typing import List, Dict, Any, Optional
+import orjson
+from typing import Callable, List, Dict, Any, Optional
 from django.conf import settings
 
+from .llm_cache import make_cache_key, get_cached_completion, set_cached_completion
+
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+
+def extract_json(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a JSON object out of model output, tolerating surrounding
+    prose and markdown fences. Returns None when nothing parses.
+    """
+    match = _JSON_OBJECT_RE.search(text)
+    if match:
+        try:
+            parsed = orjson.loads(match.group(0))
+            if isinstance(parsed, dict):
+                return parsed
+        except orjson.JSONDecodeError:
+            pass
+    return None
+
 
 class AgenticAI:
     """
@@ -10,62 +33,229 @@ class AgenticAI:
     and generates comprehensive reports through iterative reasoning
     """
 
-    def __init__(self, user_query: str, dataset_context: Optional[Dict] = None):
+    def __init__(self, user_query: str, dataset_context: Optional[Dict] = None,
+                 on_token: Optional[Callable[[str], Any]] = None):
         self.user_query = user_query
         self.dataset_context = dataset_context or {}
-        self.client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        self.client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+        self.on_token = on_token  # Called with each streamed text chunk (may be async)
         self.conversation_history = []
         self.reasoning_trace = []
         self.tools_used = []
         self.findings = {}
+        self.findings_summary = ""
+
+        # Settings attribute lookups go through Django's LazySettings on
+        # every access - resolve them once per agent instead of per call
+        self._model = settings.DEFAULT_LLM_MODEL
+        self._small_model = settings.SMALL_LLM_MODEL
+        self._max_iterations = settings.MAX_AGENT_ITERATIONS
+
+        # The dataset context never changes after construction but is
+        # interpolated into most prompts - serialize it once
+        self._dataset_context_json = orjson.dumps(self.dataset_context).decode()
+        self._findings_json = None  # memoized, invalidated on mutation
+
+    async def _stream_completion(self, max_tokens: int, messages: List[Dict],
+                                 system: Optional[str] = None, forward: bool = False,
+                                 model: Optional[str] = None) -> str:
+        """
+        Stream a completion from Anthropic instead of blocking on the full
+        generation. When forward=True, each text chunk is pushed to the
+        on_token callback as it arrives (used for the final report so the
+        client starts rendering almost immediately).
+        """
+        kwargs = {
+            'model': model or self._model,
+            'max_tokens': max_tokens,
+            'messages': messages,
+        }
+        if system:
+            # System prompts repeat verbatim across iterations - mark
+            # them cacheable so Anthropic reuses the processed prefix
+            kwargs['system'] = [{
+                'type': 'text',
+                'text': system,
+                'cache_control': {'type': 'ephemeral'},
+            }]
+
+        # Identical calls (task retries, repeated sessions) skip the API entirely
+        cache_key = make_cache_key(kwargs['model'], messages, max_tokens, system)
+        cached = get_cached_completion(cache_key)
+        if cached is not None:
+            if forward and self.on_token:
+                maybe_awaitable = self.on_token(cached)
+                if inspect.isawaitable(maybe_awaitable):
+                    await maybe_awaitable
+            return cached
+
+        chunks = []
+        async with self.client.messages.stream(**kwargs) as stream:
+            async for text in stream.text_stream:
+                chunks.append(text)
+                if forward and self.on_token:
+                    maybe_awaitable = self.on_token(text)
+                    if inspect.isawaitable(maybe_awaitable):
+                        await maybe_awaitable
+
+        completion = ''.join(chunks)
+        set_cached_completion(cache_key, completion)
+        return completion
+
+    @staticmethod
+    def _user_message(static: str, dynamic: str) -> Dict[str, Any]:
+        """
+        User message split into a cacheable static prefix (plan, dataset
+        context) and the per-iteration dynamic suffix
+        """
+        return {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": static, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": dynamic},
+            ]
+        }
+
+    def _store_finding(self, key: str, value: Any):
+        """Record a finding and invalidate the memoized serialization"""
+        self.findings[key] = value
+        self._findings_json = None
+
+    def _serialized_findings(self) -> str:
+        """Findings JSON, reserialized only after a mutation"""
+        if self._findings_json is None:
+            self._findings_json = orjson.dumps(self.findings).decode()
+        return self._findings_json
+
+    def _findings_context(self) -> str:
+        """
+        Findings serialized for prompts: once older iterations have been
+        compressed, only the rolling summary plus the latest result is
+        sent instead of the full (ever-growing) dict.
+        """
+        if not self.findings_summary:
+            return self._serialized_findings()
+
+        latest_key = next(reversed(self.findings), None)
+        latest = orjson.dumps(
+            {latest_key: self.findings[latest_key]}
+        ).decode() if latest_key else '{}'
+
+        return f"Summary of earlier findings: {self.findings_summary}\nLatest: {latest}"
+
+    async def _maybe_compress_findings(self):
+        """
+        Once the findings blob would dominate prompt tokens, compress
+        everything but the latest result into a rolling summary with the
+        small model and drop the compressed entries. The full results
+        stay available in reasoning_trace.
+        """
+        if len(self._serialized_findings()) <= 4000 or len(self.findings) < 2:
+            return
+
+        keys = list(self.findings)
+        older_keys, latest_key = keys[:-1], keys[-1]
+        older_blob = orjson.dumps({key: self.findings[key] for key in older_keys}).decode()
+
+        prompt = f"""
+        Condense these analysis findings into a dense summary (max 300 words).
+        Preserve concrete numbers, column names, and conclusions.
+
+        Earlier summary: {self.findings_summary or 'none'}
+
+        Findings: {older_blob}
+        """
+
+        self.findings_summary = await self._stream_completion(
+            max_tokens=500,
+            messages=[{"role": "user", "content": prompt}],
+            model=self._small_model
+        )
+        self.findings = {latest_key: self.findings[latest_key]}
+        self._findings_json = None
 
     def run(self) -> Dict[str, Any]:
+        """Synchronous entry point for the async agent loop"""
+        return asyncio.run(self.run_async())
+
+    async def run_async(self) -> Dict[str, Any]:
         """
-        Main agentic loop - agent decides what to investigate and how
+        Main agentic loop - agent decides what to investigate and how.
+        Independent LLM calls are fanned out with asyncio.gather so
+        wall clock time scales with the slowest call, not the sum.
         """
         # Step 1: Planning phase
-        plan = self._create_analysis_plan()
+        plan = await self._create_analysis_plan()
         self.reasoning_trace.append({
             'phase': 'planning',
             'content': plan
         })
-        
+
+        # Fan out the plan's independent key questions concurrently
+        key_questions = plan.get('key_questions') if isinstance(plan, dict) else None
+        if isinstance(key_questions, list) and len(key_questions) > 1:
+            analyses = await asyncio.gather(*[
+                self._perform_analysis({'action': 'analyze', 'target': question})
+                for question in key_questions
+            ])
+            for index, result in enumerate(analyses, start=1):
+                self._store_finding(f"question_{index}", result)
+                self.reasoning_trace.append({
+                    'phase': 'investigation',
+                    'question': key_questions[index - 1],
+                    'result': result
+                })
+            self.tools_used.append('analyze')
+
         # Step 2: Investigation phase (iterative)
-        investigation_complete = False
         iteration = 0
-        max_iterations = settings.MAX_AGENT_ITERATIONS
-        
-        while not investigation_complete and iteration < max_iterations:
+        max_iterations = self._max_iterations
+        next_action = await self._decide_next_action(plan, 1)
+
+        while iteration < max_iterations:
             iteration += 1
-            
-            # Agent decides next action
-            next_action = self._decide_next_action(plan, iteration)
-            
-            if next_action['action'] == 'complete':
-                investigation_complete = True
+
+            if next_action.get('action') == 'complete':
                 break
-            
+
             # Execute the action
-            result = self._execute_action(next_action)
-            
+            result = await self._execute_action(next_action)
+
             # Store findings
-            self.findings[f"iteration_{iteration}"] = result
+            self._store_finding(f"iteration_{iteration}", result)
             self.reasoning_trace.append({
                 'phase': 'investigation',
                 'iteration': iteration,
                 'action': next_action,
                 'result': result
             })
-            
-            # Agent reflects on results and decides if more investigation needed
-            if self._should_continue_investigation(result, iteration):
-                continue
-            else:
-                investigation_complete = True
-        
+
+            # The reflection would always say stop once the iteration
+            # budget is exhausted - skip both remaining LLM calls
+            if iteration >= max_iterations - 1:
+                break
+
+            # The analysis already signalled completion through its
+            # structured output - no need for a reflection round trip
+            if 'next_steps' in result and not result.get('next_steps'):
+                break
+
+            # Keep prompt context bounded as findings accumulate
+            await self._maybe_compress_findings()
+
+            # Overlap the reflection with the next action decision - both
+            # depend only on the findings accumulated so far
+            should_continue, next_action = await asyncio.gather(
+                self._should_continue_investigation(result, iteration),
+                self._decide_next_action(plan, iteration + 1)
+            )
+
+            if not should_continue:
+                break
+
         # Step 3: Synthesis phase
-        final_report = self._synthesize_report()
-        
+        final_report = await self._synthesize_report()
+
         return {
             'report': final_report,
             'reasoning_trace': self.reasoning_trace,
@@ -73,7 +263,7 @@ class AgenticAI:
             'findings': self.findings
         }
     
-    def _create_analysis_plan(self) -> Dict[str, Any]:
+    async def _create_analysis_plan(self) -> Dict[str, Any]:
         """Agent creates its own analysis plan based on query and data"""
         
         system_prompt = """You are an expert data analyst AI agent. Given a user query and dataset context, 
@@ -88,71 +278,75 @@ class AgenticAI:
         
         user_message = f"""
         User Query: {self.user_query}
-        
+
         Dataset Context:
-        {json.dumps(self.dataset_context, indent=2)}
+        {self._dataset_context_json}
         
         Create an analysis plan.
         """
         
-        response = self.client.messages.create(
-            model=settings.DEFAULT_LLM_MODEL,
+        plan_text = await self._stream_completion(
             max_tokens=2000,
             system=system_prompt,
             messages=[{"role": "user", "content": user_message}]
         )
         
-        plan_text = response.content[0].text
-        
         # Try to extract JSON, fallback to text
-        try:
-            plan = json.loads(plan_text)
-        except:
-            plan = {"raw_plan": plan_text}
-        
+        plan = extract_json(plan_text) or {"raw_plan": plan_text}
+
         return plan
     
-    def _decide_next_action(self, plan: Dict, iteration: int) -> Dict[str, Any]:
+    async def _decide_next_action(self, plan: Dict, iteration: int) -> Dict[str, Any]:
         """Agent decides what to investigate next"""
-        
-        context = f"""
-        Analysis Plan: {json.dumps(plan, indent=2)}
-        
+
+        # Past the iteration budget only "complete" makes sense - don't
+        # pay an API call to hear it
+        if iteration > self._max_iterations:
+            return {
+                "action": "complete",
+                "reasoning": "Maximum iterations reached"
+            }
+
+        # Plan and dataset context are identical on every iteration -
+        # keep them in the cached prefix, findings in the dynamic suffix
+        static_context = f"""
+        Analysis Plan: {orjson.dumps(plan).decode()}
+
+        Dataset Available: {self._dataset_context_json}
+        """
+
+        dynamic_context = f"""
         Current Iteration: {iteration}
-        
-        Previous Findings: {json.dumps(self.findings, indent=2)}
-        
-        Dataset Available: {json.dumps(self.dataset_context, indent=2)}
+
+        Previous Findings: {self._findings_context()}
         """
-        
+
         system_prompt = """You are an autonomous data analysis agent. Based on your plan and previous findings,
         decide the NEXT specific action to take. Be strategic - follow leads, dig deeper into anomalies.
-        
+
         Return JSON with:
         - action: "analyze", "calculate", "compare", "investigate_anomaly", or "complete"
         - target: What specifically to analyze
         - method: How to analyze it
         - reasoning: Why this is the next best step
         """
-        
-        response = self.client.messages.create(
-            model=settings.DEFAULT_LLM_MODEL,
+
+        # Control-flow decision - route to the small/fast model
+        action_text = await self._stream_completion(
             max_tokens=1500,
             system=system_prompt,
-            messages=[{"role": "user", "content": context}]
+            messages=[self._user_message(static_context, dynamic_context)],
+            model=self._small_model
         )
-        
-        try:
-            action = json.loads(response.content[0].text)
-        except:
-            action = {
-                "action": "complete",
-                "reasoning": "Unable to parse action, completing analysis"
-            }
-        
+
+        action = extract_json(action_text) or {
+            "action": "complete",
+            "reasoning": "Unable to parse action, completing analysis"
+        }
+
         return action
     
-    def _execute_action(self, action: Dict[str, Any]) -> Dict[str, Any]:
+    async def _execute_action(self, action: Dict[str, Any]) -> Dict[str, Any]:
         """Execute the decided action"""
         
         action_type = action.get('action', 'analyze')
@@ -161,7 +355,7 @@ class AgenticAI:
         # For now, we'll simulate with LLM-based analysis
         
         if action_type == 'analyze':
-            result = self._perform_analysis(action)
+            result = await self._perform_analysis(action)
         elif action_type == 'calculate':
             result = self._perform_calculation(action)
         elif action_type == 'compare':
@@ -174,33 +368,32 @@ class AgenticAI:
         self.tools_used.append(action_type)
         return result
     
-    def _perform_analysis(self, action: Dict) -> Dict[str, Any]:
+    async def _perform_analysis(self, action: Dict) -> Dict[str, Any]:
         """Perform data analysis based on action"""
         
-        prompt = f"""
+        static_context = f"""
+        Dataset Context: {self._dataset_context_json}
+        """
+
+        dynamic_context = f"""
         Analyze the following based on the action:
-        
-        Action: {json.dumps(action, indent=2)}
-        Dataset Context: {json.dumps(self.dataset_context, indent=2)}
-        Previous Findings: {json.dumps(self.findings, indent=2)}
-        
+
+        Action: {orjson.dumps(action).decode()}
+        Previous Findings: {self._findings_context()}
+
         Provide specific analytical insights in JSON format with:
         - insight: Main finding
         - data_points: Key data points discovered
         - significance: Why this matters
         - next_steps: What this suggests we should investigate next (if anything)
         """
-        
-        response = self.client.messages.create(
-            model=settings.DEFAULT_LLM_MODEL,
+
+        analysis_text = await self._stream_completion(
             max_tokens=2000,
-            messages=[{"role": "user", "content": prompt}]
+            messages=[self._user_message(static_context, dynamic_context)]
         )
-        
-        try:
-            return json.loads(response.content[0].text)
-        except:
-            return {"insight": response.content[0].text}
+
+        return extract_json(analysis_text) or {"insight": analysis_text}
     
     def _perform_calculation(self, action: Dict) -> Dict[str, Any]:
         """Perform calculations"""
@@ -217,17 +410,17 @@ class AgenticAI:
         # Implement anomaly investigation
         return {"anomaly_investigation": "completed", "action": action}
     
-    def _should_continue_investigation(self, result: Dict, iteration: int) -> bool:
+    async def _should_continue_investigation(self, result: Dict, iteration: int) -> bool:
         """Agent decides if more investigation is needed"""
         
-        if iteration >= settings.MAX_AGENT_ITERATIONS - 1:
+        if iteration >= self._max_iterations - 1:
             return False
         
         # Ask agent if it needs to continue
         prompt = f"""
-        Based on this result: {json.dumps(result, indent=2)}
+        Based on this result: {orjson.dumps(result).decode()}
         
-        And previous findings: {json.dumps(self.findings, indent=2)}
+        And previous findings: {self._findings_context()}
         
         Original query: {self.user_query}
         
@@ -235,19 +428,17 @@ class AgenticAI:
         Respond with JSON: {{"continue": true/false, "reasoning": "why"}}
         """
         
-        response = self.client.messages.create(
-            model=settings.DEFAULT_LLM_MODEL,
+        # Control-flow decision - route to the small/fast model
+        decision_text = await self._stream_completion(
             max_tokens=500,
-            messages=[{"role": "user", "content": prompt}]
+            messages=[{"role": "user", "content": prompt}],
+            model=self._small_model
         )
-        
-        try:
-            decision = json.loads(response.content[0].text)
-            return decision.get('continue', False)
-        except:
-            return False
+
+        decision = extract_json(decision_text)
+        return decision.get('continue', False) if decision else False
     
-    def _synthesize_report(self) -> str:
+    async def _synthesize_report(self) -> str:
         """Synthesize all findings into comprehensive report"""
         
         system_prompt = """You are a senior data analyst creating a comprehensive report.
@@ -265,25 +456,25 @@ class AgenticAI:
         synthesis_context = f"""
         Original Query: {self.user_query}
         
-        Analysis Plan: {json.dumps(self.reasoning_trace[0], indent=2)}
+        Analysis Plan: {orjson.dumps(self.reasoning_trace[0]).decode()}
         
-        All Findings: {json.dumps(self.findings, indent=2)}
+        All Findings: {self._findings_context()}
         
         Tools Used: {self.tools_used}
         
-        Dataset Context: {json.dumps(self.dataset_context, indent=2)}
-        
+        Dataset Context: {self._dataset_context_json}
+
         Create the final comprehensive report.
         """
         
-        response = self.client.messages.create(
-            model=settings.DEFAULT_LLM_MODEL,
+        # Stream the final report to the client so the first token lands
+        # as soon as generation starts instead of after the full completion
+        return await self._stream_completion(
             max_tokens=4000,
             system=system_prompt,
-            messages=[{"role": "user", "content": synthesis_context}]
+            messages=[{"role": "user", "content": synthesis_context}],
+            forward=True
         )
-        
-        return response.content[0].text
 
 
 class SimpleResponseAgent:
@@ -294,29 +485,38 @@ class SimpleResponseAgent:
         self.context = context
         self.client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
     
-    def respond(self) -> str:
+    def respond(self, max_tokens: int = 1000) -> str:
         """Generate simple response"""
-        
-        system_prompt = """You are a helpful AI assistant for data analysis. 
+
+        system_prompt = """You are a helpful AI assistant for data analysis.
         Respond naturally and helpfully to user queries."""
-        
+
         messages = []
         if self.context:
             messages.append({
                 "role": "assistant",
                 "content": self.context
             })
-        
+
         messages.append({
             "role": "user",
             "content": self.user_query
         })
-        
+
+        # Identical queries (e.g. title generation retries) skip the API
+        cache_key = make_cache_key(settings.SMALL_LLM_MODEL, messages, max_tokens, system_prompt)
+        cached = get_cached_completion(cache_key)
+        if cached is not None:
+            return cached
+
+        # Conversational queries don't need the big model - use the fast tier
         response = self.client.messages.create(
-            model=settings.DEFAULT_LLM_MODEL,
-            max_tokens=1000,
+            model=settings.SMALL_LLM_MODEL,
+            max_tokens=max_tokens,
             system=system_prompt,
             messages=messages
         )
-        
-        return response.content[0].text
\ No newline at end of file
+
+        text = response.content[0].text
+        set_cached_completion(cache_key, text)
+        return text
\ No newline at end of file
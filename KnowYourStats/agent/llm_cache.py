@@ -0,0 +1,50 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+
+CACHE_TTL = 3600  # 1 hour
+
+# Small in-process LRU in front of the shared Redis cache
+_LOCAL_MAXSIZE = 512
+_local_cache = OrderedDict()
+
+
+def make_cache_key(model: str, messages: List[Dict], max_tokens: int,
+                   system: Optional[str] = None) -> str:
+    """Build a deterministic cache key for an LLM call"""
+    payload = json.dumps({
+        'model': model,
+        'system': system,
+        'messages': messages,
+        'max_tokens': max_tokens,
+    }, sort_keys=True)
+    return 'llm:' + hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _store_local(key: str, text: str):
+    """Store in the in-process LRU, evicting the oldest entry if full"""
+    _local_cache[key] = text
+    _local_cache.move_to_end(key)
+    if len(_local_cache) > _LOCAL_MAXSIZE:
+        _local_cache.popitem(last=False)
+
+
+def get_cached_completion(key: str) -> Optional[str]:
+    """Look up a completion, checking the local LRU before Redis"""
+    if key in _local_cache:
+        _local_cache.move_to_end(key)
+        return _local_cache[key]
+
+    text = cache.get(key)
+    if text is not None:
+        _store_local(key, text)
+    return text
+
+
+def set_cached_completion(key: str, text: str, ttl: int = CACHE_TTL):
+    """Store a completion in both cache levels"""
+    _store_local(key, text)
+    cache.set(key, text, ttl)
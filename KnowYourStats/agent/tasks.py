@@ -1,6 +1,11 @@
+from asgiref.sync import async_to_sync
 from celery import shared_task
+from channels.layers import get_channel_layer
+from django.conf import settings
 from .agent_core import AgenticAI, SimpleResponseAgent
+import anthropic
 import json
+import os
 
 
 @shared_task(bind=True, max_retries=2)
@@ -9,14 +14,70 @@ def process_agent_message(self, user_query, dataset_context=None, chat_session_i
     Process user message with Agentic AI
     This runs asynchronously to avoid blocking WebSocket
     """
-    
+
     try:
+        # Forward streamed report tokens to the chat group as they arrive
+        on_token = None
+        if chat_session_id:
+            channel_layer = get_channel_layer()
+            group_name = f'chat_{chat_session_id}'
+
+            async def on_token(chunk):
+                await channel_layer.group_send(
+                    group_name,
+                    {
+                        'type': 'agent_stream_chunk',
+                        'chunk': chunk
+                    }
+                )
+
         # Initialize agent
-        agent = AgenticAI(user_query, dataset_context)
-        
+        agent = AgenticAI(user_query, dataset_context, on_token=on_token)
+
         # Run agentic analysis
         result = agent.run()
-        
+
+        # Persist the report message and push it back to the consumer
+        # through the channel layer
+        if chat_session_id:
+            from django.db import transaction
+            from django.db.models import F
+            from django.utils import timezone
+            from chat.models import ChatSession, Message
+
+            metadata = {
+                'reasoning_trace': result['reasoning_trace'],
+                'tools_used': result['tools_used']
+            }
+
+            with transaction.atomic():
+                message = Message.objects.create(
+                    chat_session_id=chat_session_id,
+                    role='agent',
+                    content=result['report'],
+                    message_type='report',
+                    metadata=metadata
+                )
+                ChatSession.objects.filter(id=chat_session_id).update(
+                    message_count=F('message_count') + 1,
+                    last_message_at=timezone.now()
+                )
+
+            async_to_sync(channel_layer.group_send)(
+                group_name,
+                {
+                    'type': 'agent_response',
+                    'message': {
+                        'id': str(message.id),
+                        'role': 'agent',
+                        'content': result['report'],
+                        'message_type': 'report',
+                        'metadata': metadata,
+                        'created_at': message.created_at.isoformat()
+                    }
+                }
+            )
+
         return {
             'success': True,
             'chat_session_id': chat_session_id,
@@ -44,7 +105,7 @@ def generate_chat_title(first_message):
             "Return ONLY the title, nothing else."
         )
         
-        title = agent.respond().strip().strip('"\'')
+        title = agent.respond(max_tokens=20).strip().strip('"\'')
         return title[:255]  # Ensure it fits in DB field
         
     except Exception as e:
@@ -52,6 +113,100 @@ def generate_chat_title(first_message):
         return "New Analysis Chat"
 
 
+@shared_task
+def analyze_datasets_batch(dataset_ids):
+    """
+    Submit LLM pre-analysis for many datasets through the Anthropic
+    Batch API - half the per-token cost, fine for fire-and-forget work.
+    Results are fanned back into each Dataset.metadata by the poller.
+    """
+
+    from data_manager.models import Dataset
+
+    requests = []
+    for dataset in Dataset.objects.filter(id__in=dataset_ids):
+        context = {
+            'filename': dataset.original_filename,
+            'columns': dataset.columns,
+            'row_count': dataset.row_count,
+            'column_count': dataset.column_count,
+            'metadata': dataset.metadata or {}
+        }
+        requests.append({
+            'custom_id': str(dataset.id),
+            'params': {
+                'model': settings.DEFAULT_LLM_MODEL,
+                'max_tokens': 1500,
+                'messages': [{
+                    'role': 'user',
+                    'content': (
+                        'Summarize the most valuable insights an analyst should '
+                        f'investigate in this dataset:\n{json.dumps(context)}'
+                    )
+                }]
+            }
+        })
+
+    if not requests:
+        return {'success': False, 'message': 'No datasets found'}
+
+    client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+    batch = client.messages.batches.create(requests=requests)
+
+    # Poll for completion instead of blocking the worker
+    poll_dataset_batch.apply_async(args=[batch.id], countdown=60)
+
+    return {
+        'success': True,
+        'batch_id': batch.id,
+        'submitted': len(requests)
+    }
+
+
+@shared_task
+def poll_dataset_batch(batch_id):
+    """Poll a submitted batch and store finished results on each dataset"""
+
+    from data_manager.models import Dataset
+
+    client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+    batch = client.messages.batches.retrieve(batch_id)
+
+    if batch.processing_status != 'ended':
+        # Reschedule ourselves until the batch finishes
+        poll_dataset_batch.apply_async(args=[batch_id], countdown=60)
+        return {
+            'success': True,
+            'batch_id': batch_id,
+            'status': batch.processing_status
+        }
+
+    updated = 0
+    for result in client.messages.batches.results(batch_id):
+        if result.result.type != 'succeeded':
+            continue
+
+        try:
+            dataset = Dataset.objects.get(id=result.custom_id)
+        except Dataset.DoesNotExist:
+            continue
+
+        if dataset.metadata is None:
+            dataset.metadata = {}
+
+        dataset.metadata['llm_pre_analysis'] = result.result.message.content[0].text
+        # Only the metadata column changed; a bare save() would clobber
+        # status/row_count written by an ingest task since the fetch
+        dataset.save(update_fields=['metadata', 'updated_at'])
+        updated += 1
+
+    return {
+        'success': True,
+        'batch_id': batch_id,
+        'updated': updated
+    }
+
+
 @shared_task
 def analyze_dataset_background(dataset_id, analysis_type='general'):
     """
@@ -64,22 +219,100 @@ def analyze_dataset_background(dataset_id, analysis_type='general'):
         import pandas as pd
         
         dataset = Dataset.objects.get(id=dataset_id)
-        
-        # Load data
-        if dataset.file_type == 'csv':
-            df = pd.read_csv(dataset.file.path)
+
+        # Load data. If ingest already parsed the file, read its
+        # Parquet cache through the shared loader instead of
+        # re-streaming the original - the whole point of the cache
+        cache_path = (dataset.metadata or {}).get('parquet_cache')
+        if cache_path and os.path.exists(cache_path):
+            from .tools import load_dataset_df
+
+            df = load_dataset_df(dataset)
+            row_count = len(df)
+            column_count = len(df.columns)
+            numeric_columns = list(df.select_dtypes(include=['number']).columns)
+            categorical_columns = list(df.select_dtypes(include=['object']).columns)
+            missing_data = df.isnull().sum().to_dict()
+        elif dataset.file_type == 'csv':
+            # Stream the file in chunks - row and null counts are
+            # additive, so memory stays bounded to one chunk no matter
+            # how large the file is (the C engine supports chunksize,
+            # pyarrow does not). While streaming, spill the parsed
+            # chunks to a Parquet cache so later tool calls never
+            # re-parse the CSV.
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            cache_path = f'{dataset.file.path}.parquet'
+            writer = None
+            row_count = 0
+            nulls = None
+            dtypes = None
+            for chunk in pd.read_csv(dataset.file.path, chunksize=200_000):
+                row_count += len(chunk)
+                chunk_nulls = chunk.isnull().sum()
+                nulls = chunk_nulls if nulls is None else nulls.add(chunk_nulls, fill_value=0)
+                if dtypes is None:
+                    dtypes = chunk.dtypes
+
+                if cache_path is not None:
+                    try:
+                        table = pa.Table.from_pandas(chunk, preserve_index=False)
+                        if writer is None:
+                            writer = pq.ParquetWriter(cache_path, table.schema, compression='zstd')
+                        writer.write_table(table)
+                    except (pa.ArrowInvalid, pa.ArrowTypeError):
+                        # Inconsistent chunk schemas - drop the cache,
+                        # keep streaming the stats
+                        if writer is not None:
+                            writer.close()
+                            writer = None
+                        if os.path.exists(cache_path):
+                            os.remove(cache_path)
+                        cache_path = None
+
+            if writer is not None:
+                writer.close()
+
+            if cache_path is not None and writer is not None:
+                if dataset.metadata is None:
+                    dataset.metadata = {}
+                dataset.metadata['parquet_cache'] = cache_path
+
+            if dtypes is None:
+                raise ValueError('Dataset file is empty')
+
+            column_count = len(dtypes)
+            numeric_columns = [col for col, dtype in dtypes.items()
+                               if pd.api.types.is_numeric_dtype(dtype)]
+            categorical_columns = [col for col, dtype in dtypes.items()
+                                   if dtype == object]
+            missing_data = {col: int(count) for col, count in nulls.items()}
         else:
-            df = pd.read_excel(dataset.file.path)
-        
+            # Metadata-only run - profile a sample and get the true row
+            # count from the sheet header instead of loading every cell
+            df = pd.read_excel(dataset.file.path, nrows=10000)
+            row_count = len(df)
+            if dataset.file_type == 'xlsx':
+                from openpyxl import load_workbook
+                workbook = load_workbook(dataset.file.path, read_only=True)
+                row_count = max(workbook.active.max_row - 1, 0)
+                workbook.close()
+
+            column_count = len(df.columns)
+            numeric_columns = list(df.select_dtypes(include=['number']).columns)
+            categorical_columns = list(df.select_dtypes(include=['object']).columns)
+            missing_data = df.isnull().sum().to_dict()
+
         # Perform analysis based on type
         if analysis_type == 'general':
             # General statistical analysis
             insights = {
-                'row_count': len(df),
-                'column_count': len(df.columns),
-                'numeric_columns': list(df.select_dtypes(include=['number']).columns),
-                'categorical_columns': list(df.select_dtypes(include=['object']).columns),
-                'missing_data': df.isnull().sum().to_dict()
+                'row_count': row_count,
+                'column_count': column_count,
+                'numeric_columns': numeric_columns,
+                'categorical_columns': categorical_columns,
+                'missing_data': missing_data
             }
         
         # Store insights in dataset metadata
@@ -87,7 +320,7 @@ def analyze_dataset_background(dataset_id, analysis_type='general'):
             dataset.metadata = {}
         
         dataset.metadata['background_analysis'] = insights
-        dataset.save()
+        dataset.save(update_fields=['metadata', 'updated_at'])
         
         return {
             'success': True,
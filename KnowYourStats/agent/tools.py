@@ -1,14 +1,76 @@
 import pandas as pd
 import numpy as np
+import pyarrow.parquet as pq
 from typing import Dict, Any, List, Optional
 import json
+import os
+
+
+def load_dataset_df(dataset) -> pd.DataFrame:
+    """
+    Load a dataset's DataFrame, preferring the Parquet cache written on
+    first read. Parquet loads 5-20x faster than re-parsing CSV/Excel,
+    and the memory-mapped read avoids copying the file through
+    userspace on repeated tool calls.
+    """
+    cache_path = (dataset.metadata or {}).get('parquet_cache')
+    if cache_path and os.path.exists(cache_path):
+        return pq.read_table(cache_path, memory_map=True).to_pandas()
+
+    if dataset.file_type == 'csv':
+        df = pd.read_csv(dataset.file.path, engine='pyarrow')
+    else:
+        df = pd.read_excel(dataset.file.path)
+
+    # Cache the parsed frame for subsequent reads; best-effort
+    try:
+        cache_path = f'{dataset.file.path}.parquet'
+        df.to_parquet(cache_path, engine='pyarrow', compression='zstd')
+        if dataset.metadata is None:
+            dataset.metadata = {}
+        dataset.metadata['parquet_cache'] = cache_path
+        # Touch only the metadata column - a bare save() here would
+        # write back possibly-stale status/row_count over a concurrent
+        # ingest task's updates
+        dataset.save(update_fields=['metadata', 'updated_at'])
+    except Exception:
+        pass
+
+    return df
 
 
 class DataAnalysisTools:
     """Collection of tools the agent can use for data analysis"""
     
-    def __init__(self, dataframe: Optional[pd.DataFrame] = None):
+    def __init__(self, dataframe: Optional[pd.DataFrame] = None, downcast: bool = True):
+        # Reductions like corr/quantile/histogram are bound by memory
+        # bandwidth, so float64->float32 / int64->int32 roughly doubles
+        # their throughput; pass downcast=False when full precision matters
+        if dataframe is not None and downcast:
+            dataframe = self._downcast(dataframe)
+
         self.df = dataframe
+
+        # Dtype categorization is needed by most tools - scan the
+        # columns once here instead of on every call
+        if dataframe is not None:
+            self._numeric_cols = list(dataframe.select_dtypes(include=[np.number]).columns)
+            self._categorical_cols = list(dataframe.select_dtypes(include=['object', 'category']).columns)
+            numeric_set = set(self._numeric_cols)
+            self._is_numeric = {col: col in numeric_set for col in dataframe.columns}
+        else:
+            self._numeric_cols = []
+            self._categorical_cols = []
+            self._is_numeric = {}
+
+    @staticmethod
+    def _downcast(df: pd.DataFrame) -> pd.DataFrame:
+        """Downcast numeric columns to the smallest dtype that fits"""
+        df = df.copy(deep=False)
+        for col in df.select_dtypes(include=[np.number]).columns:
+            target = 'float' if df[col].dtype.kind == 'f' else 'integer'
+            df[col] = pd.to_numeric(df[col], downcast=target)
+        return df
     
     def get_basic_stats(self) -> Dict[str, Any]:
         """Get basic statistical summary"""
@@ -19,8 +81,8 @@ class DataAnalysisTools:
             "row_count": len(self.df),
             "column_count": len(self.df.columns),
             "columns": list(self.df.columns),
-            "numeric_columns": list(self.df.select_dtypes(include=[np.number]).columns),
-            "categorical_columns": list(self.df.select_dtypes(include=['object']).columns),
+            "numeric_columns": self._numeric_cols,
+            "categorical_columns": self._categorical_cols,
             "missing_values": self.df.isnull().sum().to_dict(),
             "summary_stats": self.df.describe().to_dict()
         }
@@ -42,26 +104,67 @@ class DataAnalysisTools:
             "unique_count": int(col.nunique())
         }
         
-        if pd.api.types.is_numeric_dtype(col):
-            analysis.update({
-                "mean": float(col.mean()) if not col.empty else None,
-                "median": float(col.median()) if not col.empty else None,
-                "std": float(col.std()) if not col.empty else None,
-                "min": float(col.min()) if not col.empty else None,
-                "max": float(col.max()) if not col.empty else None,
-                "quartiles": {
-                    "q1": float(col.quantile(0.25)) if not col.empty else None,
-                    "q2": float(col.quantile(0.50)) if not col.empty else None,
-                    "q3": float(col.quantile(0.75)) if not col.empty else None,
-                }
-            })
+        if self._is_numeric.get(column_name):
+            # Compute all stats from one dropna'd ndarray instead of
+            # separate pandas passes per statistic
+            values = col.to_numpy(dtype=float)
+            values = values[~np.isnan(values)]
+
+            if values.size > 0:
+                q1, q2, q3 = np.percentile(values, [25, 50, 75])
+                analysis.update({
+                    "mean": float(values.mean()),
+                    "median": float(q2),
+                    "std": float(values.std(ddof=1)) if values.size > 1 else None,
+                    "min": float(values.min()),
+                    "max": float(values.max()),
+                    "quartiles": {
+                        "q1": float(q1),
+                        "q2": float(q2),
+                        "q3": float(q3),
+                    }
+                })
+            else:
+                analysis.update({
+                    "mean": None,
+                    "median": None,
+                    "std": None,
+                    "min": None,
+                    "max": None,
+                    "quartiles": {"q1": None, "q2": None, "q3": None}
+                })
         else:
-            # Categorical analysis
-            value_counts = col.value_counts()
-            analysis.update({
-                "top_values": value_counts.head(10).to_dict(),
-                "mode": str(col.mode()[0]) if not col.mode().empty else None
-            })
+            # Categorical analysis - O(U) top-K via argpartition instead
+            # of fully sorting every unique value by count
+            non_null = col.dropna()
+            try:
+                values, counts = np.unique(non_null.to_numpy(), return_counts=True)
+            except TypeError:
+                # np.unique sorts, which blows up on object columns
+                # mixing strings and numbers - fall back to the hashed
+                # value_counts path for those
+                top = non_null.value_counts().head(10)
+                analysis.update({
+                    "top_values": {
+                        str(value): int(count)
+                        for value, count in top.items()
+                    },
+                    "mode": str(top.index[0]) if len(top) > 0 else None
+                })
+                return analysis
+            if counts.size > 0:
+                k = min(10, counts.size)
+                idx = np.argpartition(-counts, k - 1)[:k]
+                idx = idx[np.argsort(-counts[idx])]
+                analysis.update({
+                    "top_values": {
+                        str(value): int(count)
+                        for value, count in zip(values[idx], counts[idx])
+                    },
+                    "mode": str(values[idx[0]])
+                })
+            else:
+                analysis.update({"top_values": {}, "mode": None})
         
         return analysis
     
@@ -70,30 +173,38 @@ class DataAnalysisTools:
         if self.df is None:
             return {"error": "No dataset loaded"}
         
-        numeric_df = self.df.select_dtypes(include=[np.number])
-        
-        if numeric_df.empty:
+        if not self._numeric_cols:
             return {"error": "No numeric columns found"}
+
+        numeric_df = self.df[self._numeric_cols]
         
         corr_matrix = numeric_df.corr()
-        
-        # Find strong correlations
-        strong_correlations = []
-        for i in range(len(corr_matrix.columns)):
-            for j in range(i+1, len(corr_matrix.columns)):
-                corr_value = corr_matrix.iloc[i, j]
-                if abs(corr_value) >= threshold:
-                    strong_correlations.append({
-                        "column1": corr_matrix.columns[i],
-                        "column2": corr_matrix.columns[j],
-                        "correlation": float(corr_value),
-                        "strength": "strong" if abs(corr_value) > 0.7 else "moderate"
-                    })
-        
-        return {
-            "correlation_matrix": corr_matrix.to_dict(),
-            "strong_correlations": strong_correlations
-        }
+
+        # Find strong correlations in one vectorized pass over the
+        # upper triangle instead of a Python double loop with iloc
+        columns = corr_matrix.columns.to_numpy()
+        i, j = np.triu_indices(len(columns), k=1)
+        values = corr_matrix.values[i, j]
+        selected = np.abs(values) >= threshold
+
+        strong_correlations = [
+            {
+                "column1": col1,
+                "column2": col2,
+                "correlation": float(value),
+                "strength": "strong" if abs(value) > 0.7 else "moderate"
+            }
+            for col1, col2, value in zip(columns[i[selected]], columns[j[selected]], values[selected])
+        ]
+
+        result = {"strong_correlations": strong_correlations}
+
+        # The full matrix is quadratic in column count - only include it
+        # for frames where that stays cheap
+        if len(columns) <= 25:
+            result["correlation_matrix"] = corr_matrix.to_dict()
+
+        return result
     
     def detect_outliers(self, column_name: str, method: str = "iqr") -> Dict[str, Any]:
         """Detect outliers in a numeric column"""
@@ -101,13 +212,19 @@ class DataAnalysisTools:
             return {"error": f"Column {column_name} not found"}
         
         col = self.df[column_name]
-        
-        if not pd.api.types.is_numeric_dtype(col):
+
+        if not self._is_numeric.get(column_name):
             return {"error": f"Column {column_name} is not numeric"}
         
         if method == "iqr":
-            Q1 = col.quantile(0.25)
-            Q3 = col.quantile(0.75)
+            values = col.to_numpy(dtype=float)
+            values = values[~np.isnan(values)]
+
+            if values.size == 0:
+                return {"error": f"Column {column_name} has no numeric values"}
+
+            # Both quartiles in a single partition pass
+            Q1, Q3 = np.percentile(values, [25, 75])
             IQR = Q3 - Q1
             lower_bound = Q1 - 1.5 * IQR
             upper_bound = Q3 + 1.5 * IQR
@@ -136,15 +253,27 @@ class DataAnalysisTools:
         if group_column not in self.df.columns or value_column not in self.df.columns:
             return {"error": "Columns not found"}
         
-        grouped = self.df.groupby(group_column)[value_column].agg([
+        # observed=True skips unused categories on categorical groupers
+        # and sort=False avoids re-sorting output we don't rely on
+        grouped = self.df.groupby(group_column, observed=True, sort=False)[value_column].agg([
             'count', 'mean', 'median', 'std', 'min', 'max'
         ])
-        
-        return {
+
+        # Cap the payload for high-cardinality groupers - keep the
+        # largest groups rather than building one dict per group
+        truncated = len(grouped) > 50
+        if truncated:
+            grouped = grouped.nlargest(50, 'count')
+
+        result = {
             "group_column": group_column,
             "value_column": value_column,
             "comparison": grouped.to_dict('index')
         }
+        if truncated:
+            result["truncated_to_top"] = 50
+
+        return result
     
     def get_time_series_insights(self, date_column: str, value_column: str) -> Dict[str, Any]:
         """Analyze time series data"""
@@ -152,28 +281,43 @@ class DataAnalysisTools:
             return {"error": "No dataset loaded"}
         
         try:
-            df_copy = self.df.copy()
-            df_copy[date_column] = pd.to_datetime(df_copy[date_column])
-            df_copy = df_copy.sort_values(date_column)
-            
-            # Basic trend
-            values = df_copy[value_column].values
-            trend = "increasing" if values[-1] > values[0] else "decreasing"
-            
+            # Only the first/last values by date are used, so find the
+            # endpoints directly instead of copying and sorting the frame
+            dates = pd.to_datetime(self.df[date_column], errors='coerce')
+            mask = dates.notna()
+            data_points = int(mask.sum())
+
+            if data_points == 0:
+                return {
+                    "date_column": date_column,
+                    "value_column": value_column,
+                    "trend": None,
+                    "growth_rate_percent": 0.0,
+                    "start_value": None,
+                    "end_value": None,
+                    "data_points": 0
+                }
+
+            valid_dates = dates[mask]
+            start_value = float(self.df.at[valid_dates.idxmin(), value_column])
+            end_value = float(self.df.at[valid_dates.idxmax(), value_column])
+
+            trend = "increasing" if end_value > start_value else "decreasing"
+
             # Calculate growth rate
-            if len(values) > 1:
-                growth_rate = ((values[-1] - values[0]) / values[0]) * 100
+            if data_points > 1:
+                growth_rate = ((end_value - start_value) / start_value) * 100
             else:
                 growth_rate = 0
-            
+
             return {
                 "date_column": date_column,
                 "value_column": value_column,
                 "trend": trend,
                 "growth_rate_percent": float(growth_rate),
-                "start_value": float(values[0]) if len(values) > 0 else None,
-                "end_value": float(values[-1]) if len(values) > 0 else None,
-                "data_points": int(len(values))
+                "start_value": start_value,
+                "end_value": end_value,
+                "data_points": data_points
             }
         except Exception as e:
             return {"error": str(e)}
@@ -198,10 +342,10 @@ class DataAnalysisTools:
             return {"error": "Column not found"}
         
         col = self.df[column]
-        
-        if not pd.api.types.is_numeric_dtype(col):
+
+        if not self._is_numeric.get(column):
             return {"error": "Column must be numeric"}
-        
+
         pct_change = col.pct_change() * 100
         
         return {
@@ -218,10 +362,10 @@ class DataAnalysisTools:
             return {"error": "Column not found"}
         
         col = self.df[column]
-        
-        if not pd.api.types.is_numeric_dtype(col):
+
+        if not self._is_numeric.get(column):
             return {"error": "Column must be numeric"}
-        
+
         hist, bin_edges = np.histogram(col.dropna(), bins=bins)
         
         return {
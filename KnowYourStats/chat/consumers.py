@@ -1,12 +1,46 @@
-import json
+import asyncio
+import os
+import orjson
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.core.cache import cache
+from django.db.models import F
 from django.utils import timezone
 from .models import ChatSession, Message
 from data_manager.models import Dataset
-from agent.agent_core import AgenticAI, SimpleResponseAgent
+from agent.agent_core import SimpleResponseAgent
 from agent.tasks import process_agent_message
 import pandas as pd
+import re
+from pyarrow import csv as pa_csv
+
+# Keywords that route a message to the full agentic analysis pipeline,
+# compiled once so each check is a single scan of the content
+_ANALYSIS_RE = re.compile(
+    r'\b(analyze|analysis|report|investigate|find|show|compare|'
+    r'correlation|trend|pattern|insight|what)\b',
+    re.IGNORECASE
+)
+
+
+# Max inbound frames per user per second before the consumer starts
+# rejecting - keeps a runaway client from monopolizing the event loop
+# with DB writes and LLM dispatches
+_RATE_LIMIT_PER_SECOND = 5
+
+# Reports above this size are streamed in multiple frames so neither
+# side has to hold (or wait for) one giant encoded payload
+_WS_CHUNK_SIZE = 4096
+
+
+def _dumps(obj) -> str:
+    """orjson encode to str - 3-5x faster than stdlib json on the
+    per-message hot path; UUIDs and datetimes serialize natively"""
+    return orjson.dumps(obj, default=str).decode()
+
+
+_loads = orjson.loads
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
@@ -22,8 +56,22 @@ class ChatConsumer(AsyncWebsocketConsumer):
         
         self.chat_session_id = self.scope['url_route']['kwargs']['chat_session_id']
         self.room_group_name = f'chat_{self.chat_session_id}'
+
+        # Validate ownership and seed the local message counter once per
+        # connection so save_message never re-reads the session row
+        session = await ChatSession.objects.filter(
+            id=self.chat_session_id, user=self.user
+        ).values('message_count').afirst()
+
+        if session is None:
+            await self.close()
+            return
+
+        self.message_count = session['message_count']
         
-        # Join room group
+        # Group membership exists solely so Celery workers can deliver
+        # agent results and streamed chunks back to this socket; nothing
+        # the consumer itself sends goes through the channel layer
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
@@ -32,7 +80,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         await self.accept()
         
         # Send connection confirmation
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=_dumps({
             'type': 'connection_established',
             'message': 'Connected to chat',
             'chat_session_id': str(self.chat_session_id)
@@ -48,8 +96,17 @@ class ChatConsumer(AsyncWebsocketConsumer):
     
     async def receive(self, text_data):
         """Handle incoming WebSocket messages"""
+        # Token bucket per user per second, shared across connections
+        # via the cache backend
+        bucket_key = f'rl:{self.user.id}:{int(time.time())}'
+        await cache.aadd(bucket_key, 0, timeout=2)
+        count = await cache.aincr(bucket_key)
+        if count > _RATE_LIMIT_PER_SECOND:
+            await self.send_error('Rate limit exceeded, slow down')
+            return
+
         try:
-            data = json.loads(text_data)
+            data = _loads(text_data)
             message_type = data.get('type', 'message')
             
             if message_type == 'message':
@@ -59,7 +116,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             elif message_type == 'save_report':
                 await self.handle_save_report(data)
             
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             await self.send_error('Invalid JSON')
         except Exception as e:
             await self.send_error(f'Error: {str(e)}')
@@ -78,56 +135,49 @@ class ChatConsumer(AsyncWebsocketConsumer):
             message_type='text'
         )
         
-        # Send user message to group
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'chat_message',
-                'message': {
-                    'id': str(user_message.id),
-                    'role': 'user',
-                    'content': content,
-                    'message_type': 'text',
-                    'created_at': user_message.created_at.isoformat()
-                }
-            }
-        )
-        
+        # The session is 1 user <-> 1 consumer: echo straight back on
+        # this socket instead of a Redis pub/sub round trip
+        await self.send(text_data=_dumps({
+            'id': user_message.id,
+            'role': 'user',
+            'content': content,
+            'message_type': 'text',
+            'created_at': user_message.created_at
+        }))
+
         # Check if this is the first message (for auto-title generation)
-        message_count = await self.get_message_count()
-        if message_count == 1:
-            await self.generate_chat_title(content)
-        
-        # Send typing indicator
-        await self.send_typing_indicator(True)
-        
+        # using the counter save_message just bumped - no COUNT query.
+        # Fire-and-forget: the first response must not wait on the
+        # title-generation LLM round trip
+        if self.message_count == 1:
+            asyncio.create_task(self.generate_chat_title(content))
+
         # Determine if query needs agentic analysis
-        needs_analysis = await self.check_if_needs_analysis(content, data.get('dataset_id'))
-        
+        needs_analysis = self.check_if_needs_analysis(content, data.get('dataset_id'))
+
         if needs_analysis:
-            # Process with Agentic AI (async task)
+            # Typing indicators only bracket the long-running agent
+            # path; the simple response below arrives fast enough that
+            # the extra frames are pure overhead
             dataset_id = data.get('dataset_id')
+            await self.send_typing_indicator(True)
             await self.process_with_agent(content, dataset_id)
+            await self.send_typing_indicator(False)
         else:
             # Simple conversational response
             response = await self.get_simple_response(content)
             await self.send_agent_response(response, message_type='text')
-        
-        # Send typing indicator off
-        await self.send_typing_indicator(False)
     
     async def handle_typing_indicator(self, data):
         """Handle typing indicator"""
         is_typing = data.get('is_typing', False)
-        
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'typing_indicator',
-                'is_typing': is_typing,
-                'user': self.user.email
-            }
-        )
+
+        # 1:1 session - reflect straight back without a Redis hop
+        await self.send(text_data=_dumps({
+            'type': 'typing',
+            'is_typing': is_typing,
+            'user': self.user.email
+        }))
     
     async def handle_save_report(self, data):
         """Handle save report request"""
@@ -141,7 +191,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         report = await self.create_report_from_message(message_id)
         
         if report:
-            await self.send(text_data=json.dumps({
+            await self.send(text_data=_dumps({
                 'type': 'report_saved',
                 'report_id': str(report.id),
                 'message': 'Report saved successfully'
@@ -151,11 +201,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
     
     async def chat_message(self, event):
         """Send message to WebSocket"""
-        await self.send(text_data=json.dumps(event['message']))
+        await self.send(text_data=_dumps(event['message']))
     
     async def typing_indicator(self, event):
         """Send typing indicator to WebSocket"""
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=_dumps({
             'type': 'typing',
             'is_typing': event['is_typing'],
             'user': event.get('user', 'agent')
@@ -163,7 +213,37 @@ class ChatConsumer(AsyncWebsocketConsumer):
     
     async def agent_response(self, event):
         """Send agent response to WebSocket"""
-        await self.send(text_data=json.dumps(event['message']))
+        await self._send_chunked_response(event['message'])
+
+    async def _send_chunked_response(self, message):
+        """
+        Deliver a response, splitting large report content across
+        agent_response_chunk frames followed by an agent_response_end
+        frame carrying everything but the content. Small responses go
+        out as a single frame.
+        """
+        content = message.get('content') or ''
+        if len(content) <= _WS_CHUNK_SIZE:
+            await self.send(text_data=_dumps(message))
+            return
+
+        for seq, start in enumerate(range(0, len(content), _WS_CHUNK_SIZE)):
+            await self.send(text_data=_dumps({
+                'type': 'agent_response_chunk',
+                'seq': seq,
+                'content': content[start:start + _WS_CHUNK_SIZE]
+            }))
+
+        end_frame = {key: value for key, value in message.items() if key != 'content'}
+        end_frame['type'] = 'agent_response_end'
+        await self.send(text_data=_dumps(end_frame))
+
+    async def agent_stream_chunk(self, event):
+        """Forward a streamed report chunk to the client"""
+        await self.send(text_data=_dumps({
+            'type': 'agent_stream',
+            'chunk': event['chunk']
+        }))
     
     async def send_agent_response(self, content, message_type='text', metadata=None):
         """Send agent response"""
@@ -175,150 +255,156 @@ class ChatConsumer(AsyncWebsocketConsumer):
             metadata=metadata or {}
         )
         
-        # Send to group
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'agent_response',
-                'message': {
-                    'id': str(agent_message.id),
-                    'role': 'agent',
-                    'content': content,
-                    'message_type': message_type,
-                    'metadata': metadata or {},
-                    'created_at': agent_message.created_at.isoformat()
-                }
-            }
-        )
+        # Direct send - no channel-layer hop for the 1:1 session; large
+        # reports are streamed in chunks
+        await self._send_chunked_response({
+            'id': agent_message.id,
+            'role': 'agent',
+            'content': content,
+            'message_type': message_type,
+            'metadata': metadata or {},
+            'created_at': agent_message.created_at
+        })
     
     async def send_typing_indicator(self, is_typing):
         """Send typing indicator"""
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'typing_indicator',
-                'is_typing': is_typing,
-                'user': 'agent'
-            }
-        )
+        # Coalesce: repeated frames with an unchanged state are pure
+        # backpressure on the socket
+        if getattr(self, '_typing_state', None) == is_typing:
+            return
+        self._typing_state = is_typing
+
+        await self.send(text_data=_dumps({
+            'type': 'typing',
+            'is_typing': is_typing,
+            'user': 'agent'
+        }))
     
     async def send_error(self, message):
         """Send error message"""
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=_dumps({
             'type': 'error',
             'message': message
         }))
     
-    @database_sync_to_async
-    def save_message(self, role, content, message_type='text', metadata=None):
+    async def save_message(self, role, content, message_type='text', metadata=None):
         """Save message to database"""
-        chat_session = ChatSession.objects.get(id=self.chat_session_id, user=self.user)
-        
-        message = Message.objects.create(
-            chat_session=chat_session,
+        # Native async ORM - no database_sync_to_async thread-pool hop
+        # per query on the hot path. Ownership was validated in
+        # connect(), so the session row is never re-read here
+        message = await Message.objects.acreate(
+            chat_session_id=self.chat_session_id,
             role=role,
             content=content,
             message_type=message_type,
             metadata=metadata or {}
         )
-        
-        # Update chat session last message time
-        chat_session.last_message_at = timezone.now()
-        chat_session.save()
-        
+
+        # Bump the denormalized counter and last-message time in one
+        # targeted UPDATE instead of a full-row save()
+        await ChatSession.objects.filter(id=self.chat_session_id).aupdate(
+            message_count=F('message_count') + 1,
+            last_message_at=timezone.now()
+        )
+
+        # Keep the consumer's copy current so "is this the first
+        # message?" never needs another round trip
+        self.message_count += 1
+
         return message
     
-    @database_sync_to_async
-    def get_message_count(self):
-        """Get message count for chat session"""
-        return Message.objects.filter(
-            chat_session_id=self.chat_session_id
-        ).count()
-    
-    @database_sync_to_async
-    def generate_chat_title(self, first_message):
+    async def generate_chat_title(self, first_message):
         """Generate chat title from first message"""
-        from agent.agent_core import SimpleResponseAgent
-        
-        # Use AI to generate a concise title
+        # Use AI to generate a concise title - the blocking LLM call runs
+        # off-loop so the receive loop keeps serving events
         agent = SimpleResponseAgent(
             f"Generate a short 3-5 word title for a chat that starts with: '{first_message[:100]}'. Return ONLY the title, nothing else."
         )
-        title = agent.respond().strip().strip('"\'')
-        
-        # Update chat session title
-        chat_session = ChatSession.objects.get(id=self.chat_session_id)
-        chat_session.title = title[:255]  # Ensure it fits
-        chat_session.save()
-        
-        # Notify client of title update
-        self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'chat_title_updated',
-                'title': title
-            }
-        )
+        title = await asyncio.to_thread(agent.respond, 20)
+        title = title.strip().strip('"\'')
+
+        # Update chat session title with a targeted UPDATE
+        await database_sync_to_async(
+            ChatSession.objects.filter(id=self.chat_session_id).update
+        )(title=title[:255])
+
+        # Notify client of title update - this task runs on the
+        # consumer's own loop, so no channel-layer hop is needed
+        await self.send(text_data=_dumps({
+            'type': 'title_updated',
+            'title': title
+        }))
     
     async def chat_title_updated(self, event):
         """Send title update to client"""
-        await self.send(text_data=json.dumps({
+        await self.send(text_data=_dumps({
             'type': 'title_updated',
             'title': event['title']
         }))
     
-    @database_sync_to_async
     def check_if_needs_analysis(self, content, dataset_id):
         """Check if message needs agentic analysis"""
-        # Simple heuristic: if dataset_id provided or message contains analysis keywords
-        analysis_keywords = [
-            'analyze', 'analysis', 'report', 'investigate', 'find', 'show',
-            'compare', 'correlation', 'trend', 'pattern', 'insight', 'what'
-        ]
-        
+        # Simple heuristic: if dataset_id provided or message contains
+        # analysis keywords - one C-level regex scan, no DB or thread hop
         if dataset_id:
             return True
-        
-        content_lower = content.lower()
-        return any(keyword in content_lower for keyword in analysis_keywords)
+
+        return _ANALYSIS_RE.search(content) is not None
     
     async def process_with_agent(self, query, dataset_id):
         """Process query with agentic AI"""
-        # This will be handled by Celery task for heavy processing
-        # For now, send a simple processing message
-        
-        dataset_context = await self.get_dataset_context(dataset_id) if dataset_id else None
-        
-        # Send processing status
-        await self.send(text_data=json.dumps({
-            'type': 'agent_processing',
-            'message': 'Agent is analyzing your data...'
-        }))
-        
-        # In production, this would be a Celery task
-        # For now, we'll do synchronous processing
-        try:
-            agent = AgenticAI(query, dataset_context)
-            result = await database_sync_to_async(agent.run)()
-            
-            # Send report as agent response
-            await self.send_agent_response(
-                content=result['report'],
-                message_type='report',
-                metadata={
-                    'reasoning_trace': result['reasoning_trace'],
-                    'tools_used': result['tools_used']
-                }
+        # Overlap the context build (thread-pool file/DB work) with the
+        # status frame instead of running them back to back
+        if dataset_id:
+            dataset_context, _ = await asyncio.gather(
+                self.get_dataset_context(dataset_id),
+                self.send(text_data=_dumps({
+                    'type': 'agent_processing',
+                    'message': 'Agent is analyzing your data...'
+                }))
             )
-        except Exception as e:
-            await self.send_error(f'Analysis failed: {str(e)}')
+        else:
+            dataset_context = None
+            await self.send(text_data=_dumps({
+                'type': 'agent_processing',
+                'message': 'Agent is analyzing your data...'
+            }))
+
+        # The heavy LLM + pandas pipeline runs on a Celery worker so the
+        # consumer is free to serve other events immediately; streamed
+        # report chunks and the final response come back over the
+        # channel layer (agent_stream_chunk / agent_response handlers)
+        process_agent_message.delay(
+            query,
+            dataset_context,
+            str(self.chat_session_id)
+        )
     
     @database_sync_to_async
     def get_dataset_context(self, dataset_id):
         """Get dataset context for analysis"""
         try:
-            dataset = Dataset.objects.get(id=dataset_id, user=self.user)
-            
+            # Fetch only the fields the context needs - skips wide
+            # columns like description and the processing/status fields
+            # (metadata stays: it holds the stored sample and dtypes)
+            dataset = Dataset.objects.only(
+                'id', 'original_filename', 'columns', 'row_count',
+                'column_count', 'file', 'file_type', 'metadata'
+            ).get(id=dataset_id, user=self.user)
+
+            # Memoize per (dataset_id, mtime) so repeated queries against
+            # the same file skip the build entirely; mtime invalidates
+            # the entry when the file is replaced
+            try:
+                mtime = int(os.path.getmtime(dataset.file.path)) if dataset.file else 0
+            except OSError:
+                mtime = 0
+
+            cache_key = f'dsctx:{dataset_id}:{mtime}'
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
             # Load basic dataset info
             context = {
                 'filename': dataset.original_filename,
@@ -327,19 +413,35 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'column_count': dataset.column_count
             }
             
-            # Load sample data if file exists
+            # Prefer the sample stored at upload time - no file I/O at all
+            metadata = dataset.metadata or {}
+            sample = metadata.get('sample_data')
+            if sample is not None:
+                context['sample_data'] = sample
+                context['data_types'] = metadata.get('dtypes', {})
+                cache.set(cache_key, context, timeout=3600)
+                return context
+
+            # Fall back to reading the file head; pyarrow's CSV reader is
+            # far faster than pandas for a bounded head read and exposes
+            # dtypes via the Arrow schema without building a DataFrame
             if dataset.file:
                 try:
                     if dataset.file_type == 'csv':
-                        df = pd.read_csv(dataset.file.path, nrows=100)
+                        batch = pa_csv.open_csv(dataset.file.path).read_next_batch()
+                        batch = batch.slice(0, 100)
+                        context['sample_data'] = batch.to_pylist()
+                        context['data_types'] = {
+                            field.name: str(field.type) for field in batch.schema
+                        }
                     else:
                         df = pd.read_excel(dataset.file.path, nrows=100)
-                    
-                    context['sample_data'] = df.to_dict('records')
-                    context['data_types'] = df.dtypes.astype(str).to_dict()
+                        context['sample_data'] = df.to_dict('records')
+                        context['data_types'] = df.dtypes.astype(str).to_dict()
                 except Exception as e:
                     context['error'] = f'Failed to load data: {str(e)}'
-            
+
+            cache.set(cache_key, context, timeout=3600)
             return context
         except Dataset.DoesNotExist:
             return None
@@ -350,38 +452,43 @@ class ChatConsumer(AsyncWebsocketConsumer):
         agent = SimpleResponseAgent(query)
         return agent.respond()
     
-    @database_sync_to_async
-    def create_report_from_message(self, message_id):
+    async def create_report_from_message(self, message_id):
         """Create report from a message"""
         from reports.models import Report
-        
+
         try:
-            message = Message.objects.get(id=message_id, chat_session__user=self.user)
-            
+            # Bound the columns fetched - report content/metadata can be
+            # large, but nothing here needs the unrelated wide fields
+            message = await Message.objects.only(
+                'id', 'content', 'message_type', 'metadata',
+                'chat_session_id', 'created_at'
+            ).aget(id=message_id, chat_session__user=self.user)
+
             if not message.is_report_message():
                 return None
-            
-            # Get the user query (previous message)
-            user_query = Message.objects.filter(
-                chat_session=message.chat_session,
+
+            # Get the user query (previous message) - only its content
+            # is ever read
+            user_query = await Message.objects.filter(
+                chat_session_id=message.chat_session_id,
                 role='user',
                 created_at__lt=message.created_at
-            ).order_by('-created_at').first()
-            
-            report = Report.objects.create(
+            ).order_by('-created_at').only('id', 'content').afirst()
+
+            report = await Report.objects.acreate(
                 user=self.user,
-                chat_session=message.chat_session,
+                chat_session_id=message.chat_session_id,
                 title=f"Report: {user_query.content[:100] if user_query else 'Analysis'}",
                 query=user_query.content if user_query else '',
                 report_content=message.content,
                 metadata=message.metadata,
                 status='completed'
             )
-            
-            # Link message to report
+
+            # Link message to report - one-column UPDATE
             message.related_report = report
-            message.save()
-            
+            await message.asave(update_fields=['related_report'])
+
             return report
         except Message.DoesNotExist:
             return None
\ No newline at end of file
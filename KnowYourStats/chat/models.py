@@ -13,7 +13,11 @@ class ChatSession(models.Model):
         related_name='chat_sessions'
     )
     title = models.CharField(max_length=255, blank=True)
-    
+
+    # Denormalized counter maintained on insert (see ChatConsumer.save_message)
+    # so list views never aggregate across the Message table
+    message_count = models.PositiveIntegerField(default=0)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -32,7 +36,7 @@ class ChatSession(models.Model):
     
     def get_message_count(self):
         """Get total message count"""
-        return self.messages.count()
+        return self.message_count
 
 
 class Message(models.Model):
@@ -84,6 +88,18 @@ class Message(models.Model):
         ordering = ['created_at']
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
+        indexes = [
+            # Last-message lookups and reverse-chronological pagination
+            models.Index(fields=['chat_session', '-created_at']),
+            # "previous user message" lookups in report creation
+            models.Index(fields=['chat_session', 'role', '-created_at']),
+            # Report-message scans touch a tiny fraction of rows
+            models.Index(
+                fields=['chat_session', 'message_type'],
+                condition=models.Q(message_type='report'),
+                name='msg_report_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.role} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
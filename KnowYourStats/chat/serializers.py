@@ -17,7 +17,7 @@ class MessageSerializer(serializers.ModelSerializer):
 class ChatSessionSerializer(serializers.ModelSerializer):
     """Serializer for chat sessions"""
     
-    message_count = serializers.IntegerField(read_only=True, source='get_message_count')
+    message_count = serializers.IntegerField(read_only=True)
     last_message = serializers.SerializerMethodField()
     
     class Meta:
@@ -30,21 +30,33 @@ class ChatSessionSerializer(serializers.ModelSerializer):
     
     def get_last_message(self, obj):
         """Get last message preview"""
-        last_msg = obj.messages.order_by('-created_at').first()
-        if last_msg:
-            return {
-                'content': last_msg.content[:100] + ('...' if len(last_msg.content) > 100 else ''),
-                'role': last_msg.role,
-                'created_at': last_msg.created_at
-            }
-        return None
+        # List views annotate the preview via subqueries (see
+        # ChatSessionViewSet.get_queryset); only fall back to a per-row
+        # query for unannotated instances
+        if hasattr(obj, 'last_msg_content'):
+            if obj.last_msg_content is None:
+                return None
+            content, role, created_at = (
+                obj.last_msg_content, obj.last_msg_role, obj.last_msg_created_at
+            )
+        else:
+            last_msg = obj.messages.order_by('-created_at').first()
+            if not last_msg:
+                return None
+            content, role, created_at = last_msg.content, last_msg.role, last_msg.created_at
+
+        return {
+            'content': content[:100] + ('...' if len(content) > 100 else ''),
+            'role': role,
+            'created_at': created_at
+        }
 
 
 class ChatSessionDetailSerializer(serializers.ModelSerializer):
     """Detailed serializer for chat session with messages"""
     
     messages = MessageSerializer(many=True, read_only=True)
-    message_count = serializers.IntegerField(read_only=True, source='get_message_count')
+    message_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = ChatSession
@@ -2,7 +2,7 @@ from rest_framework import status, generics, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Q
+from django.db.models import OuterRef, Q, Subquery
 from .models import ChatSession, Message
 from .serializers import (
     ChatSessionSerializer,
@@ -26,10 +26,18 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Get chat sessions for current user"""
+        # Hydrate the last-message preview via subqueries so listing N
+        # sessions stays one query instead of one per session
+        last_message = Message.objects.filter(
+            chat_session=OuterRef('pk')
+        ).order_by('-created_at')
+
         return ChatSession.objects.filter(
             user=self.request.user
         ).annotate(
-            message_count=Count('messages')
+            last_msg_content=Subquery(last_message.values('content')[:1]),
+            last_msg_role=Subquery(last_message.values('role')[:1]),
+            last_msg_created_at=Subquery(last_message.values('created_at')[:1])
         )
     
     def create(self, request, *args, **kwargs):
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from pgvector.django import HalfVectorField, HnswIndex, VectorField
+from server.fields import OrjsonJSONField
 import uuid
 import os
 
@@ -47,9 +49,11 @@ class Dataset(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
     error_message = models.TextField(blank=True)
     
-    # Metadata
+    # Metadata - orjson-backed: this blob carries per-column stats and
+    # a 100-row sample, so encode/decode speed matters on every save
+    # and list response
     description = models.TextField(blank=True)
-    metadata = models.JSONField(default=dict, blank=True)
+    metadata = OrjsonJSONField(default=dict, blank=True)
     
     # Vector storage
     has_embeddings = models.BooleanField(default=False)
@@ -63,6 +67,11 @@ class Dataset(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Dataset'
         verbose_name_plural = 'Datasets'
+        indexes = [
+            # Covers the list view: filter by user (optionally status),
+            # ordered by newest first
+            models.Index(fields=['user', 'status', '-created_at']),
+        ]
     
     def __str__(self):
         return f"{self.original_filename} - {self.user.email}"
@@ -73,16 +82,26 @@ class Dataset(models.Model):
     
     def delete(self, *args, **kwargs):
         """Delete file when dataset is deleted"""
-        if self.file:
-            if os.path.isfile(self.file.path):
-                os.remove(self.file.path)
-        
-        # Delete FAISS index if exists
-        if self.faiss_index_path and os.path.exists(self.faiss_index_path):
-            os.remove(self.faiss_index_path)
-        
+        # Capture paths before the row disappears; the actual removal
+        # happens in a Celery task so large files or FAISS indexes on
+        # slow storage never block the request thread
+        file_path = self.file.path if self.file else None
+        faiss_path = self.faiss_index_path or None
+
+        # The Parquet cache written by ingest lives next to the upload;
+        # without this it would outlive the dataset and leak a file
+        # roughly the dataset's size per delete
+        parquet_path = None
+        if isinstance(self.metadata, dict):
+            parquet_path = self.metadata.get('parquet_cache')
+        if parquet_path is None and file_path:
+            parquet_path = f'{file_path}.parquet'
+
         super().delete(*args, **kwargs)
 
+        from .tasks import cleanup_dataset_files
+        cleanup_dataset_files.delay(file_path, faiss_path, parquet_path)
+
 
 class DatasetChunk(models.Model):
     """Chunked data for vector embeddings"""
@@ -94,12 +113,23 @@ class DatasetChunk(models.Model):
         related_name='chunks'
     )
     
-    # Chunk data
-    content = models.TextField()
+    # Chunk data as Arrow IPC bytes - binary packed encoding is several
+    # times faster to serialize than JSON (no float-to-string) and
+    # 2-3x smaller, and readers get typed columns back without any
+    # Python-level parsing
+    content = models.BinaryField()
     chunk_index = models.IntegerField()
     
-    # Embedding
-    embedding = models.JSONField(null=True, blank=True)
+    # Embedding - a real vector column instead of a JSON-encoded list,
+    # so similarity search runs in the database against binary FP32
+    # data with an ANN index rather than re-parsing text per row
+    embedding = VectorField(dimensions=1536, null=True, blank=True)
+
+    # Half-precision copy used for ANN search: similarity scans are
+    # memory-bandwidth-bound, so halving the bytes per vector roughly
+    # doubles throughput at negligible recall cost. Populated alongside
+    # embedding at ingest; the FP32 column stays for exact rescoring
+    embedding_half = HalfVectorField(dimensions=1536, null=True, blank=True)
     
     # Metadata
     metadata = models.JSONField(default=dict, blank=True)
@@ -111,6 +141,22 @@ class DatasetChunk(models.Model):
         unique_together = ['dataset', 'chunk_index']
         verbose_name = 'Dataset Chunk'
         verbose_name_plural = 'Dataset Chunks'
+        indexes = [
+            HnswIndex(
+                name='chunk_emb_hnsw',
+                fields=['embedding'],
+                m=16,
+                ef_construction=64,
+                opclasses=['vector_cosine_ops']
+            ),
+            HnswIndex(
+                name='chunk_emb_half_hnsw',
+                fields=['embedding_half'],
+                m=16,
+                ef_construction=64,
+                opclasses=['halfvec_ip_ops']
+            ),
+        ]
     
     def __str__(self):
         return f"Chunk {self.chunk_index} of {self.dataset.original_filename}"
\ No newline at end of file
@@ -1,5 +1,18 @@
 from rest_framework import serializers
 from .models import Dataset, DatasetChunk
+import base64
+import os
+
+# Shared by upload validation and DatasetViewSet.create
+_ALLOWED_EXT = frozenset({'csv', 'xlsx', 'xls'})
+
+# Upload size ceiling (50MB)
+_MAX_UPLOAD_SIZE = 50 << 20
+
+# Metadata keys that are heavy (the 100-row preview sample) or purely
+# server-internal (worker filesystem paths) - stripped from API
+# responses; the preview and statistics endpoints serve that data
+_INTERNAL_METADATA_KEYS = ('sample_data', 'parquet_cache')
 
 
 class DatasetSerializer(serializers.ModelSerializer):
@@ -25,6 +38,22 @@ class DatasetSerializer(serializers.ModelSerializer):
         """Get file size in MB"""
         return round(obj.file_size / (1024 * 1024), 2) if obj.file_size else 0
 
+    def to_representation(self, instance):
+        """Serialize the dataset without the heavy metadata payloads.
+
+        Ingest parks the 100-row preview sample and worker-local cache
+        paths in metadata; repeating those in every list/detail (and
+        embedded dataset_info) response bloats payloads the client
+        never reads from here."""
+        data = super().to_representation(instance)
+        metadata = data.get('metadata')
+        if metadata:
+            data['metadata'] = {
+                key: value for key, value in metadata.items()
+                if key not in _INTERNAL_METADATA_KEYS
+            }
+        return data
+
 
 class DatasetUploadSerializer(serializers.ModelSerializer):
     """Serializer for uploading datasets"""
@@ -38,29 +67,37 @@ class DatasetUploadSerializer(serializers.ModelSerializer):
     
     def validate_file(self, value):
         """Validate uploaded file"""
-        # Check file extension
-        extension = value.name.split('.')[-1].lower()
-        allowed_extensions = ['csv', 'xlsx', 'xls']
-        
-        if extension not in allowed_extensions:
+        # Size first: a constant-time attribute check that rejects
+        # oversized uploads before any name parsing. Error strings are
+        # only built on the raising path
+        if value.size > _MAX_UPLOAD_SIZE:
             raise serializers.ValidationError(
-                f'File type .{extension} not supported. Allowed: {", ".join(allowed_extensions)}'
+                f'File size exceeds 50MB limit. Your file: {round(value.size / (1024 * 1024), 2)}MB'
             )
-        
-        # Check file size (50MB max)
-        max_size = 50 * 1024 * 1024  # 50MB
-        if value.size > max_size:
+
+        extension = os.path.splitext(value.name)[1][1:].lower()
+        if extension not in _ALLOWED_EXT:
             raise serializers.ValidationError(
-                f'File size exceeds 50MB limit. Your file: {round(value.size / (1024 * 1024), 2)}MB'
+                f'File type .{extension} not supported. Allowed: {", ".join(sorted(_ALLOWED_EXT))}'
             )
-        
+
         return value
 
 
 class DatasetChunkSerializer(serializers.ModelSerializer):
     """Serializer for dataset chunks"""
-    
+
+    content = serializers.SerializerMethodField()
+
     class Meta:
         model = DatasetChunk
         fields = ['id', 'chunk_index', 'content', 'metadata', 'created_at']
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at']
+
+    def get_content(self, obj):
+        """Base64 of the Arrow IPC bytes, only when explicitly requested.
+        Internal consumers read the bytes directly via
+        pa.ipc.open_stream - the encode is for API clients only."""
+        if not self.context.get('include_content'):
+            return None
+        return base64.b64encode(bytes(obj.content)).decode('ascii') if obj.content else None
\ No newline at end of file
@@ -1,5 +1,10 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db.models import Value
+from django.db.models.functions import Concat
+from server.fields import OrjsonJSONField
 import uuid
 
 
@@ -42,10 +47,10 @@ class Report(models.Model):
     )
     
     # Dataset snapshot (in case dataset is deleted)
-    dataset_snapshot = models.JSONField(default=dict, blank=True)  # Store key dataset info
-    
+    dataset_snapshot = OrjsonJSONField(default=dict, blank=True)  # Store key dataset info
+
     # Report metadata
-    metadata = models.JSONField(default=dict, blank=True)
+    metadata = OrjsonJSONField(default=dict, blank=True)
     analysis_type = models.CharField(max_length=100, blank=True)  # e.g., "trend_analysis", "correlation"
     
     # Status
@@ -53,7 +58,25 @@ class Report(models.Model):
     error_message = models.TextField(blank=True)
     
     # Agent reasoning trace (for debugging/transparency)
-    reasoning_trace = models.JSONField(default=list, blank=True)
+    reasoning_trace = OrjsonJSONField(default=list, blank=True)
+
+    # Generated tsvector over title+query; the GIN index below turns
+    # list search into an index lookup instead of ILIKE '%...%'
+    # scanning every row
+    search_vector = models.GeneratedField(
+        expression=SearchVector('title', 'query', config='english'),
+        output_field=SearchVectorField(),
+        db_persist=True
+    )
+
+    # title+query concatenated once so substring search filters a
+    # single trigram-indexed column instead of two separate ILIKEs
+    # (the trigram index needs: CREATE EXTENSION pg_trgm)
+    searchable = models.GeneratedField(
+        expression=Concat('title', Value(' '), 'query'),
+        output_field=models.TextField(),
+        db_persist=True
+    )
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -63,6 +86,36 @@ class Report(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Report'
         verbose_name_plural = 'Reports'
+        indexes = [
+            # List view: per-user reports, newest first; the trailing
+            # id makes the cursor paginator's tie-break part of the
+            # same index range scan
+            models.Index(fields=['user', '-created_at', '-id']),
+            # The other whitelisted list orderings; indexes scan both
+            # directions, so one per column covers asc and desc
+            models.Index(fields=['user', '-updated_at', '-id']),
+            models.Index(fields=['user', 'title', 'id']),
+            # Reverse lookups from a dataset to its reports
+            models.Index(fields=['dataset']),
+            # Filtered counts and the analysis-type breakdown in the
+            # statistics action
+            models.Index(fields=['user', 'status']),
+            models.Index(fields=['user', 'analysis_type']),
+            GinIndex(fields=['search_vector'], name='report_search_gin'),
+            GinIndex(
+                fields=['searchable'],
+                name='report_trgm_gin',
+                opclasses=['gin_trgm_ops']
+            ),
+        ]
+        constraints = [
+            # The counters denormalization trusts status values; have
+            # the database enforce them too
+            models.CheckConstraint(
+                condition=models.Q(status__in=['generating', 'completed', 'failed']),
+                name='report_status_valid'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.email}"
@@ -74,6 +127,34 @@ class Report(models.Model):
         return self.query[:max_length] + "..."
 
 
+class UserReportCounters(models.Model):
+    """
+    Denormalized per-user report counts, maintained by Report signals.
+    Makes the statistics dashboard O(1) instead of rescanning the
+    user's reports on every load.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='report_counters',
+        primary_key=True
+    )
+    total = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    by_analysis_type = OrjsonJSONField(default=dict, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'User Report Counters'
+        verbose_name_plural = 'User Report Counters'
+
+    def __str__(self):
+        return f"Report counters for {self.user_id}"
+
+
 class ReportVisualization(models.Model):
     """Store visualizations/charts generated for reports"""
     
@@ -96,8 +177,8 @@ class ReportVisualization(models.Model):
     # Visualization data
     chart_type = models.CharField(max_length=20, choices=CHART_TYPE_CHOICES)
     title = models.CharField(max_length=255)
-    data = models.JSONField()  # Chart data in JSON format
-    config = models.JSONField(default=dict, blank=True)  # Chart configuration
+    data = OrjsonJSONField()  # Chart data in JSON format
+    config = OrjsonJSONField(default=dict, blank=True)  # Chart configuration
     
     # Order
     order = models.IntegerField(default=0)
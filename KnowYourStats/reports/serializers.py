@@ -37,9 +37,34 @@ class ReportSerializer(serializers.ModelSerializer):
     
     def get_visualization_count(self, obj):
         """Get count of visualizations"""
+        # Annotated by the view's queryset; per-row count only when the
+        # serializer is used on a bare instance
+        viz_count = getattr(obj, 'viz_count', None)
+        if viz_count is not None:
+            return viz_count
         return obj.visualizations.count()
 
 
+class ReportListSerializer(serializers.ModelSerializer):
+    """
+    Light serializer for report lists. Leaves out report_content,
+    dataset_snapshot and metadata - blobs that dominate row width but
+    aren't shown in list views - so the queryset can restrict the
+    columns it fetches with only().
+    """
+
+    visualization_count = serializers.IntegerField(source='viz_count', read_only=True)
+
+    class Meta:
+        model = Report
+        fields = [
+            'id', 'title', 'query', 'dataset', 'analysis_type',
+            'status', 'error_message', 'visualization_count',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
 class ReportDetailSerializer(serializers.ModelSerializer):
     """Detailed serializer for reports with visualizations"""
     
@@ -63,13 +88,31 @@ class ReportDetailSerializer(serializers.ModelSerializer):
 
 class CreateReportSerializer(serializers.ModelSerializer):
     """Serializer for creating reports"""
-    
+
+    # Read-only instance fields so the create response comes from this
+    # serializer in one pass - no second ReportSerializer walk (which
+    # would also re-count visualizations and re-fetch the dataset)
+    id = serializers.UUIDField(read_only=True)
+    status = serializers.CharField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Scope the dataset FK to the requesting user: validation then
+        # doubles as the ownership check, and the instance it fetches
+        # is reused by the view instead of a second SELECT
+        request = self.context.get('request')
+        if request is not None:
+            self.fields['dataset'].queryset = request.user.datasets.all()
+
     class Meta:
         model = Report
         fields = [
-            'title', 'query', 'report_content',
+            'id', 'title', 'query', 'report_content',
             'dataset', 'dataset_snapshot', 'metadata',
-            'analysis_type', 'reasoning_trace'
+            'analysis_type', 'reasoning_trace', 'status',
+            'created_at', 'updated_at'
         ]
         extra_kwargs = {
             'dataset': {'required': False},
@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Report, UserReportCounters
+
+
+def _stats_cache_key(user_id):
+    return f'report_stats:{user_id}'
+
+
+def _apply_report_delta(report, delta):
+    """Shift the owner's counters by one report, under a row lock"""
+    with transaction.atomic():
+        counters, _ = (
+            UserReportCounters.objects
+            .select_for_update()
+            .get_or_create(user_id=report.user_id)
+        )
+        counters.total = max(counters.total + delta, 0)
+        if report.status == 'completed':
+            counters.completed = max(counters.completed + delta, 0)
+        elif report.status == 'failed':
+            counters.failed = max(counters.failed + delta, 0)
+        if report.analysis_type:
+            by_type = counters.by_analysis_type
+            count = by_type.get(report.analysis_type, 0) + delta
+            if count > 0:
+                by_type[report.analysis_type] = count
+            else:
+                by_type.pop(report.analysis_type, None)
+        counters.save()
+
+
+def rebuild_report_counters(user_id):
+    """
+    Recompute a user's counters from the reports table. Used as a
+    backfill for users predating the counters row and after report
+    updates, where the old status/analysis_type isn't known.
+    """
+    totals = Report.objects.filter(user_id=user_id).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        failed=Count('id', filter=Q(status='failed'))
+    )
+
+    # values_list yields flat tuples - no per-row dict allocation on
+    # the way to the mapping
+    by_type = {
+        analysis_type: count
+        for analysis_type, count in Report.objects.filter(user_id=user_id)
+        .values('analysis_type')
+        .annotate(count=Count('id'))
+        .values_list('analysis_type', 'count')
+        if analysis_type
+    }
+
+    with transaction.atomic():
+        counters, _ = (
+            UserReportCounters.objects
+            .select_for_update()
+            .get_or_create(user_id=user_id)
+        )
+        counters.total = totals['total']
+        counters.completed = totals['completed']
+        counters.failed = totals['failed']
+        counters.by_analysis_type = by_type
+        counters.save()
+    return counters
+
+
+@receiver(post_save, sender=Report)
+def update_counters_on_save(sender, instance, created, **kwargs):
+    """Keep the denormalized counters in step with report writes"""
+    if created:
+        _apply_report_delta(instance, +1)
+    else:
+        # An update may have moved the report between status or
+        # analysis-type buckets; without the old values a recount of
+        # this user's reports is the safe correction
+        rebuild_report_counters(instance.user_id)
+    cache.delete(_stats_cache_key(instance.user_id))
+
+
+@receiver(post_delete, sender=Report)
+def update_counters_on_delete(sender, instance, **kwargs):
+    """Back the deleted report out of the counters"""
+    _apply_report_delta(instance, -1)
+    cache.delete(_stats_cache_key(instance.user_id))
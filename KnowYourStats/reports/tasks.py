@@ -0,0 +1,67 @@
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+import orjson
+import os
+
+
+def export_artifact_name(report, fmt):
+    """Artifact filename keyed by (id, updated_at): a report edit
+    changes the name, so stale artifacts are never served"""
+    return f'{report.id}-{int(report.updated_at.timestamp())}.{fmt}'
+
+
+def export_url_cache_key(report, fmt):
+    """Cache key for a rendered artifact's URL, stamped like the
+    filename so a report edit misses instead of serving the old URL"""
+    return f'report_export:{report.id}:{fmt}:{int(report.updated_at.timestamp())}'
+
+
+def export_pending_cache_key(report_id, fmt):
+    """Short-lived marker meaning a render task is already queued"""
+    return f'report_export_pending:{report_id}:{fmt}'
+
+
+@shared_task
+def generate_report_export(report_id, fmt='json'):
+    """
+    Render a report export off the request path and persist it under
+    MEDIA_ROOT/exports. Rendering can be a multi-second burst (PDF/
+    DOCX in production); running it here keeps web workers free and
+    the artifact is reused until the report changes.
+    """
+    from .models import Report
+
+    report = Report.objects.get(id=report_id)
+
+    export_dir = os.path.join(settings.MEDIA_ROOT, 'exports')
+    os.makedirs(export_dir, exist_ok=True)
+    filename = export_artifact_name(report, fmt)
+    path = os.path.join(export_dir, filename)
+
+    if fmt == 'md':
+        content = (
+            f'# {report.title}\n\n'
+            f'**Query:** {report.query}\n\n'
+            f'{report.report_content}\n'
+        ).encode()
+    else:
+        content = orjson.dumps({
+            'title': report.title,
+            'query': report.query,
+            'report_content': report.report_content,
+            'dataset_info': report.dataset_snapshot,
+            'created_at': report.created_at.isoformat(),
+            'analysis_type': report.analysis_type
+        })
+
+    # Write-then-rename so a concurrent poll never sees a partial file
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+    url = f'{settings.MEDIA_URL}exports/{filename}'
+    cache.set(export_url_cache_key(report, fmt), url, 3600)
+    cache.delete(export_pending_cache_key(report_id, fmt))
+    return url
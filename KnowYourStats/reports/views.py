@@ -1,85 +1,165 @@
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Count
-from .models import Report, ReportVisualization
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.cache import cache
+from django.db.models import Count, Prefetch, Q
+from django.utils.http import http_date
+from .models import Report, ReportVisualization, UserReportCounters
+from .signals import rebuild_report_counters
+from .tasks import (
+    export_artifact_name,
+    export_pending_cache_key,
+    export_url_cache_key,
+    generate_report_export,
+)
 from .serializers import (
     ReportSerializer,
+    ReportListSerializer,
     ReportDetailSerializer,
     CreateReportSerializer,
     ReportVisualizationSerializer
 )
-from data_manager.models import Dataset
+import hashlib
+import os
+
+
+def _report_etag(report):
+    """Validator for conditional GETs - changes only when the row does"""
+    return f'"{hashlib.md5(f"{report.id}:{report.updated_at.timestamp()}".encode()).hexdigest()}"'
+
+
+# Orderings clients may request; each is backed by a composite index
+# so no sort node ever appears in the plan. Anything else (say, the
+# multi-MB report_content column) is rejected up front
+_ALLOWED_ORDERING = frozenset({
+    'created_at', '-created_at',
+    'updated_at', '-updated_at',
+    'title', '-title',
+})
+
+
+class ReportCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id). Unlike LIMIT/OFFSET, each
+    page is an index range scan whose cost is independent of how deep
+    the client has paged, and there is no COUNT(*) per request.
+    """
+    page_size = 25
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        requested = request.query_params.get('order_by')
+        if requested is None:
+            return self.ordering
+        if requested not in _ALLOWED_ORDERING:
+            raise ValidationError({
+                'order_by': f'Ordering must be one of: {", ".join(sorted(_ALLOWED_ORDERING))}'
+            })
+        # Keep the id tie-break so the cursor stays unique
+        return (requested, '-id' if requested.startswith('-') else 'id')
 
 
 class ReportViewSet(viewsets.ModelViewSet):
     """ViewSet for reports"""
-    
+
     permission_classes = [IsAuthenticated]
+    pagination_class = ReportCursorPagination
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return ReportDetailSerializer
         elif self.action == 'create':
             return CreateReportSerializer
+        elif self.action == 'list':
+            return ReportListSerializer
         return ReportSerializer
     
     def get_queryset(self):
         """Get reports for current user"""
-        return Report.objects.filter(
+        # viz_count rides along in the main query; without it every
+        # serialized report issues its own SELECT COUNT(*)
+        queryset = Report.objects.filter(
             user=self.request.user
-        ).select_related('dataset', 'chat_session')
+        ).annotate(viz_count=Count('visualizations'))
+
+        if self.action == 'list':
+            # The list serializer renders only light columns (plus the
+            # viz_count annotation) - fetch exactly those and leave
+            # report_content/dataset_snapshot/metadata on disk
+            return queryset.only(
+                'id', 'title', 'query', 'dataset', 'analysis_type',
+                'status', 'error_message', 'created_at', 'updated_at'
+            )
+
+        queryset = queryset.select_related('dataset', 'chat_session')
+        if self.action == 'retrieve':
+            # Detail serializer embeds visualizations; one prefetch
+            # query, already ordered for display
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'visualizations',
+                    queryset=ReportVisualization.objects.order_by('order')
+                )
+            )
+        return queryset
     
     def create(self, request, *args, **kwargs):
         """Create new report"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # Create dataset snapshot if dataset provided
-        dataset_id = serializer.validated_data.get('dataset')
+        # Create dataset snapshot if dataset provided. The serializer's
+        # user-scoped FK validation already fetched (and ownership-
+        # checked) the instance - no second SELECT
+        dataset = serializer.validated_data.get('dataset')
         dataset_snapshot = {}
-        
-        if dataset_id:
-            try:
-                dataset = Dataset.objects.get(id=dataset_id.id, user=request.user)
-                dataset_snapshot = {
-                    'filename': dataset.original_filename,
-                    'columns': dataset.columns,
-                    'row_count': dataset.row_count,
-                    'column_count': dataset.column_count,
-                    'created_at': dataset.created_at.isoformat()
-                }
-            except Dataset.DoesNotExist:
-                pass
-        
-        report = Report.objects.create(
-            user=request.user,
-            dataset_snapshot=dataset_snapshot,
-            **serializer.validated_data
-        )
-        
+
+        if dataset:
+            dataset_snapshot = {
+                'filename': dataset.original_filename,
+                'columns': dataset.columns,
+                'row_count': dataset.row_count,
+                'column_count': dataset.column_count,
+                'created_at': dataset.created_at.isoformat()
+            }
+        
+        # Save through the bound serializer and respond with its data -
+        # one serialization pass, no second serializer re-walking the
+        # instance
+        serializer.save(user=request.user, dataset_snapshot=dataset_snapshot)
+
         return Response({
             'success': True,
             'message': 'Report created successfully',
-            'data': ReportSerializer(report).data
+            'data': serializer.data
         }, status=status.HTTP_201_CREATED)
     
     def retrieve(self, request, *args, **kwargs):
         """Get report details"""
+        # get_queryset is already scoped to request.user, so
+        # get_object() 404s on non-owners - no explicit check needed
         instance = self.get_object()
-        
-        # Check ownership
-        if instance.user != request.user:
-            return Response({
-                'success': False,
-                'message': 'Not authorized'
-            }, status=status.HTTP_403_FORBIDDEN)
-        
+
+        # Conditional GET: a matching validator means the client's
+        # copy is current, so skip serializing the (possibly huge)
+        # report_content entirely
+        etag = _report_etag(instance)
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
         serializer = self.get_serializer(instance)
         return Response({
             'success': True,
             'data': serializer.data
+        }, headers={
+            'ETag': etag,
+            'Last-Modified': http_date(instance.updated_at.timestamp())
         })
     
     def list(self, request, *args, **kwargs):
@@ -96,18 +176,20 @@ class ReportViewSet(viewsets.ModelViewSet):
         if analysis_type:
             queryset = queryset.filter(analysis_type=analysis_type)
         
-        # Search
+        # Search - word match against the GIN-indexed tsvector, plus a
+        # substring match on the concatenated searchable column whose
+        # trigram index catches partial words FTS would miss. Both arms
+        # are index scans
         search = request.query_params.get('search')
         if search:
             queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(query__icontains=search)
+                Q(search_vector=SearchQuery(search, config='english')) |
+                Q(searchable__icontains=search)
             )
         
-        # Order by
-        order_by = request.query_params.get('order_by', '-created_at')
-        queryset = queryset.order_by(order_by)
-        
+        # Ordering is owned by the cursor paginator - an arbitrary
+        # order_by would break keyset continuation
+
         # Pagination
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -123,22 +205,22 @@ class ReportViewSet(viewsets.ModelViewSet):
     def update(self, request, *args, **kwargs):
         """Update report"""
         instance = self.get_object()
-        
-        # Check ownership
-        if instance.user != request.user:
-            return Response({
-                'success': False,
-                'message': 'Not authorized'
-            }, status=status.HTTP_403_FORBIDDEN)
-        
+
         # Only allow updating certain fields
         allowed_fields = ['title', 'metadata']
         update_data = {k: v for k, v in request.data.items() if k in allowed_fields}
         
         serializer = self.get_serializer(instance, data=update_data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        
+
+        # Apply and save only the mutated columns - a bare save() would
+        # rewrite the whole row, including the multi-MB report_content
+        for field, value in serializer.validated_data.items():
+            setattr(instance, field, value)
+        instance.save(
+            update_fields=list(serializer.validated_data) + ['updated_at']
+        )
+
         return Response({
             'success': True,
             'message': 'Report updated',
@@ -147,17 +229,23 @@ class ReportViewSet(viewsets.ModelViewSet):
     
     def destroy(self, request, *args, **kwargs):
         """Delete report"""
-        instance = self.get_object()
-        
-        # Check ownership
-        if instance.user != request.user:
+        # One user-scoped DELETE instead of SELECT-then-delete; the
+        # filter is the ownership check. A pk that isn't a valid UUID
+        # raises before the query runs - that's a 404, not a 500, the
+        # same answer get_object() would have given
+        try:
+            deleted, _ = Report.objects.filter(
+                pk=kwargs['pk'], user=request.user
+            ).delete()
+        except (DjangoValidationError, ValueError):
+            deleted = 0
+
+        if not deleted:
             return Response({
                 'success': False,
-                'message': 'Not authorized'
-            }, status=status.HTTP_403_FORBIDDEN)
-        
-        instance.delete()
-        
+                'message': 'Not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+
         return Response({
             'success': True,
             'message': 'Report deleted'
@@ -166,29 +254,42 @@ class ReportViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get report statistics"""
-        user_reports = self.get_queryset()
-        
+        # Dashboards poll this endpoint; a short per-user cache
+        # collapses the polls to one computation per minute. Report
+        # save/delete signals invalidate the key eagerly
+        cache_key = f'report_stats:{request.user.id}'
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return Response({
+                'success': True,
+                'data': cached
+            })
+
+        # Counts come from the signal-maintained counters row - one
+        # primary-key fetch however many reports the user has. Users
+        # predating the counters table get a one-off recount
+        counters = UserReportCounters.objects.filter(
+            user=request.user
+        ).first()
+        if counters is None:
+            counters = rebuild_report_counters(request.user.id)
+
         stats = {
-            'total_reports': user_reports.count(),
-            'completed_reports': user_reports.filter(status='completed').count(),
-            'failed_reports': user_reports.filter(status='failed').count(),
-            'by_analysis_type': {},
+            'total_reports': counters.total,
+            'completed_reports': counters.completed,
+            'failed_reports': counters.failed,
+            'by_analysis_type': dict(sorted(
+                counters.by_analysis_type.items(),
+                key=lambda item: -item[1]
+            )),
             'recent_reports': []
         }
-        
-        # Count by analysis type
-        analysis_types = user_reports.values('analysis_type').annotate(
-            count=Count('id')
-        ).order_by('-count')
-        
-        for item in analysis_types:
-            if item['analysis_type']:
-                stats['by_analysis_type'][item['analysis_type']] = item['count']
-        
+
         # Get 5 most recent reports
-        recent = user_reports.order_by('-created_at')[:5]
+        recent = self.get_queryset().order_by('-created_at')[:5]
         stats['recent_reports'] = ReportSerializer(recent, many=True).data
-        
+
+        cache.set(cache_key, stats, 60)
         return Response({
             'success': True,
             'data': stats
@@ -198,51 +299,86 @@ class ReportViewSet(viewsets.ModelViewSet):
     def add_visualization(self, request, pk=None):
         """Add visualization to report"""
         report = self.get_object()
-        
-        if report.user != request.user:
-            return Response({
-                'success': False,
-                'message': 'Not authorized'
-            }, status=status.HTTP_403_FORBIDDEN)
-        
+
         serializer = ReportVisualizationSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        
-        visualization = ReportVisualization.objects.create(
-            report=report,
-            **serializer.validated_data
-        )
-        
+        serializer.save(report=report)
+
         return Response({
             'success': True,
             'message': 'Visualization added',
-            'data': ReportVisualizationSerializer(visualization).data
+            'data': serializer.data
         }, status=status.HTTP_201_CREATED)
     
+    @action(detail=True, methods=['post'])
+    def add_visualizations(self, request, pk=None):
+        """Add several visualizations to a report in one INSERT"""
+        report = self.get_object()
+
+        serializer = ReportVisualizationSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        # One multi-row INSERT instead of a round-trip per chart
+        visualizations = ReportVisualization.objects.bulk_create(
+            [
+                ReportVisualization(report=report, **item)
+                for item in serializer.validated_data
+            ],
+            batch_size=500
+        )
+
+        return Response({
+            'success': True,
+            'message': f'{len(visualizations)} visualizations added',
+            'data': ReportVisualizationSerializer(visualizations, many=True).data
+        }, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['get'])
     def export(self, request, pk=None):
-        """Export report (could be PDF, DOCX, etc.)"""
+        """Export report asynchronously; poll until the artifact is ready"""
         report = self.get_object()
-        
-        if report.user != request.user:
+
+        # Completed reports are immutable - let clients 304 instead of
+        # re-polling the artifact state
+        etag = _report_etag(report)
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        fmt = request.query_params.get('format', 'json')
+        if fmt not in ('json', 'md'):
             return Response({
                 'success': False,
-                'message': 'Not authorized'
-            }, status=status.HTTP_403_FORBIDDEN)
-        
-        # For now, just return the report data
-        # In production, you'd generate PDF/DOCX
-        
-        export_data = {
-            'title': report.title,
-            'query': report.query,
-            'report_content': report.report_content,
-            'dataset_info': report.dataset_snapshot,
-            'created_at': report.created_at.isoformat(),
-            'analysis_type': report.analysis_type
-        }
-        
+                'message': f'Unsupported export format: {fmt}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Serve a previously rendered artifact if the report hasn't
+        # changed since - the filename and the cache key are both
+        # stamped with updated_at, so an edited report always misses
+        filename = export_artifact_name(report, fmt)
+        url = cache.get(export_url_cache_key(report, fmt))
+        if url is None and os.path.exists(
+            os.path.join(settings.MEDIA_ROOT, 'exports', filename)
+        ):
+            url = f'{settings.MEDIA_URL}exports/{filename}'
+
+        if url is not None:
+            # ETag only on the ready response: a 202 must never be
+            # revalidated into a 304 before the artifact exists
+            return Response({
+                'success': True,
+                'data': {'status': 'ready', 'url': url}
+            }, headers={
+                'ETag': etag,
+                'Last-Modified': http_date(report.updated_at.timestamp())
+            })
+
+        # Rendering happens in a worker so a slow export never pins a
+        # web process; the client polls this same endpoint. cache.add
+        # is atomic, so concurrent polls enqueue the render once - the
+        # task clears the marker (and the TTL bounds a lost task)
+        if cache.add(export_pending_cache_key(str(report.id), fmt), True, 60):
+            generate_report_export.delay(str(report.id), fmt)
         return Response({
             'success': True,
-            'data': export_data
-        })
\ No newline at end of file
+            'data': {'status': 'generating'}
+        }, status=status.HTTP_202_ACCEPTED)
\ No newline at end of file
@@ -8,6 +8,14 @@ from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 from channels.security.websocket import AllowedHostsOriginValidator
 
+# uvloop is 2-4x faster than the default selector loop for WebSocket
+# workloads; fall back silently where the wheel is unavailable
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
 
 # Initialize Django ASGI application early to ensure the AppRegistry
@@ -0,0 +1,50 @@
+from django.db import models
+from django.db.models import expressions
+import orjson
+
+
+def _orjson_dumps(value):
+    return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+class OrjsonJSONField(models.JSONField):
+    """
+    JSONField that round-trips through orjson instead of stdlib json.
+    orjson's SIMD number formatting is 3-5x faster, which matters for
+    the large metadata / chart-payload blobs this project stores, and
+    OPT_SERIALIZE_NUMPY lets ingest code assign numpy scalars without
+    converting them first.
+    """
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        # Encoding has to happen here, not in get_prep_value: on
+        # Django 5 the base field serializes in adapt_json_value, so a
+        # string returned from get_prep_value would be JSON-encoded a
+        # second time and land in the database as a quoted blob.
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None:
+            return value
+        if isinstance(value, expressions.Value) and isinstance(
+            value.output_field, models.JSONField
+        ):
+            value = value.value
+        elif hasattr(value, 'as_sql'):
+            return value
+        if connection.vendor == 'postgresql':
+            # Hand the driver its native wrapper with orjson as the
+            # serializer so jsonb parameters bind without a re-encode
+            if connection.Database.__name__ == 'psycopg':
+                from psycopg.types.json import Jsonb
+                return Jsonb(value, dumps=_orjson_dumps)
+            from psycopg2.extras import Json
+            return Json(value, dumps=_orjson_dumps)
+        return _orjson_dumps(value)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None or not isinstance(value, (str, bytes, bytearray)):
+            return value
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return value
@@ -0,0 +1,36 @@
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+import hashlib
+
+
+class _CachedCountPaginator(Paginator):
+    """
+    Paginator whose COUNT(*) is cached for a short window, keyed by
+    the filtered queryset's SQL. Page-number pagination otherwise
+    evaluates the same WHERE clause twice per request - once for the
+    count, once for the page - which is wasteful for quick
+    page-to-page navigation over an unchanged filter.
+    """
+
+    count_timeout = 30
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None:
+            return len(self.object_list)
+
+        key = 'qs_count:' + hashlib.md5(str(query).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, self.count_timeout)
+        return count
+
+
+class CachedCountPageNumberPagination(PageNumberPagination):
+    """Default paginator: page numbers with the cached COUNT above"""
+
+    django_paginator_class = _CachedCountPaginator
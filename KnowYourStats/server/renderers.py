@@ -0,0 +1,17 @@
+from rest_framework.renderers import BaseRenderer
+import orjson
+
+
+class ORJSONRenderer(BaseRenderer):
+    """DRF renderer backed by orjson - response bodies with big
+    metadata or chart payloads encode several times faster than with
+    the stdlib-json default."""
+
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=str, option=orjson.OPT_SERIALIZE_NUMPY)